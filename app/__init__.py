@@ -1,3 +1,10 @@
-from .gui import ImageConverterApp
-
 __all__ = ["ImageConverterApp"]
+
+
+def __getattr__(name):
+    # Import the GUI lazily so headless users of app.conversion / app.cli
+    # never load tkinter or tkinterdnd2.
+    if name == "ImageConverterApp":
+        from .gui import ImageConverterApp
+        return ImageConverterApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
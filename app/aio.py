@@ -0,0 +1,109 @@
+"""asyncio front end to the converter, for embedding in async services."""
+import asyncio
+import contextlib
+import os
+from concurrent.futures import Executor
+from typing import AsyncIterable, AsyncIterator, Iterable
+
+from .conversion import _convert_file, as_specs, convert_bytes
+from .metrics import FileStats
+from .planner import OutputCollisionError, OutputPlanner
+
+
+async def convert_one_async(
+    file_path: str,
+    output_fmt: str,
+    out_folder: str,
+    executor: Executor | None = None,
+    semaphore: asyncio.Semaphore | None = None,
+    planner: OutputPlanner | None = None,
+) -> FileStats:
+    """Convert one file into out_folder, which must exist, on executor (the loop's default if None).
+
+    With a semaphore, at most its value of conversions sharing it run at once;
+    the rest wait here without occupying an executor slot.
+    A ProcessPoolExecutor works too, as _convert_file is a module-level function.
+
+    The output is named by planner (a default OutputPlanner(out_folder) if
+    None). Share one planner between calls writing into the same folder: a
+    source whose output another source has already claimed in it then fails
+    with OutputCollisionError instead of overwriting that output.
+    """
+    [spec] = as_specs(output_fmt)
+    planner = planner if planner is not None else OutputPlanner(out_folder)
+    try:
+        [output_path] = planner.claim(file_path, [spec])
+    except OutputCollisionError as exc:
+        return FileStats(
+            source=file_path,
+            message=f"Skipped {os.path.basename(file_path)}: {exc}",
+            error_class=type(exc).__name__,
+        )
+    loop = asyncio.get_running_loop()
+    async with semaphore if semaphore is not None else contextlib.nullcontext():
+        return await loop.run_in_executor(executor, _convert_file, file_path, spec, output_path)
+
+
+async def convert_bytes_async(
+    data: bytes | memoryview,
+    output_fmt: str,
+    executor: Executor | None = None,
+    semaphore: asyncio.Semaphore | None = None,
+) -> bytes:
+    """conversion.convert_bytes on executor, e.g. for an upload body already in memory."""
+    loop = asyncio.get_running_loop()
+    async with semaphore if semaphore is not None else contextlib.nullcontext():
+        return await loop.run_in_executor(executor, convert_bytes, data, output_fmt)
+
+
+async def _aiter(files: Iterable[str] | AsyncIterable[str]) -> AsyncIterator[str]:
+    if isinstance(files, AsyncIterable):
+        async for file_path in files:
+            yield file_path
+    else:
+        for file_path in files:
+            yield file_path
+
+
+async def convert_many_async(
+    files: Iterable[str] | AsyncIterable[str],
+    output_fmt: str,
+    out_folder: str,
+    concurrency: int | None = None,
+    executor: Executor | None = None,
+) -> AsyncIterator[FileStats]:
+    """Convert files, yielding each FileStats as soon as that file is done.
+
+    files may be a plain or an async iterable (e.g. a queue of uploads) and is
+    consumed lazily: at most concurrency (default: CPU count) conversions are in
+    flight and no further sources are pulled until one completes, so neither
+    tasks nor executor work pile up behind a burst. Closing the generator early
+    abandons the conversions still running; their outputs are still written
+    atomically. Sources whose output name is already taken by an earlier
+    source (a/same.png and b/same.png) fail with OutputCollisionError.
+    """
+    concurrency = max(1, concurrency or os.cpu_count() or 1)
+    os.makedirs(out_folder, exist_ok=True)
+    planner = OutputPlanner(out_folder)
+    sources = _aiter(files)
+    pending: set[asyncio.Task] = set()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    file_path = await anext(sources)
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(
+                    convert_one_async(file_path, output_fmt, out_folder, executor, planner=planner)
+                ))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
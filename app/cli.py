@@ -0,0 +1,265 @@
+"""Headless command-line interface. Never imports the GUI modules."""
+import argparse
+import os
+import sys
+from PIL import ImageColor
+
+from .conversion import (
+    DEFAULT_MATTE,
+    FIT_MODES,
+    FRAME_MODES,
+    MULTI_FRAME_FORMATS,
+    RESAMPLE_FILTERS,
+    SUPPORTED_OUTPUT_FORMATS,
+    OutputSpec,
+    as_specs,
+)
+from .dedup import DEDUPE_MODES
+from .inputs import iter_image_files
+from .jobs import ConversionJob
+from .metrics import ConversionMetrics, JsonLinesExporter
+from .planner import DEFAULT_TEMPLATE, OutputPlanner
+
+
+def _color(value: str) -> tuple:
+    try:
+        return ImageColor.getrgb(value)[:3]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a colour: {value!r}")
+
+
+def _pixels(value: str) -> int:
+    try:
+        pixels = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a whole number of pixels: {value!r}")
+    if pixels <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive number of pixels: {value!r}")
+    return pixels
+
+
+def _template(value: str) -> str:
+    try:
+        OutputPlanner(".", value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+    return value
+
+
+def _input_root(inputs: list) -> str:
+    """Deepest folder holding every input (for globs, the folder before the first wildcard)."""
+    roots = []
+    for item in inputs:
+        while any(ch in item for ch in "*?["):
+            item = os.path.dirname(item)
+        roots.append(os.path.abspath(item if os.path.isdir(item) else os.path.dirname(item) or "."))
+    return os.path.commonpath(roots)
+
+
+def _output_spec(value: str) -> OutputSpec:
+    """Parse FORMAT[:quality=Q,max=PIXELS,fit=MODE,resample=FILTER,suffix=TEXT],
+    e.g. "webp:quality=70,max=1024,suffix=_preview"."""
+    fmt, _, params = value.partition(":")
+    fmt = fmt.upper()
+    if fmt not in SUPPORTED_OUTPUT_FORMATS:
+        raise argparse.ArgumentTypeError(f"unsupported format: {fmt!r}")
+    fields = {}
+    for param in filter(None, params.split(",")):
+        key, _, val = param.partition("=")
+        try:
+            if key == "quality":
+                fields["quality"] = int(val)
+            elif key == "max":
+                fields["max_size"] = _pixels(val)
+            elif key == "suffix":
+                fields["suffix"] = val
+            elif key == "fit" and val in FIT_MODES:
+                fields["fit"] = val
+            elif key == "resample" and val in RESAMPLE_FILTERS:
+                fields["resample"] = val
+            elif key in ("fit", "resample"):
+                raise argparse.ArgumentTypeError(f"invalid {key}: {val!r}")
+            else:
+                raise argparse.ArgumentTypeError(f"unknown output option: {key!r}")
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"{key} must be an integer: {val!r}")
+    return OutputSpec(fmt, **fields)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app",
+        description="Convert images (including HEIC/HEIF) to common formats.",
+    )
+    parser.add_argument("inputs", nargs="+", help="Input files, directories or glob patterns")
+    parser.add_argument(
+        "-f", "--format",
+        type=str.upper,
+        choices=SUPPORTED_OUTPUT_FORMATS,
+        default=SUPPORTED_OUTPUT_FORMATS[0],
+        help="Output format (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--output-spec",
+        dest="specs",
+        action="append",
+        type=_output_spec,
+        metavar="FORMAT[:OPTIONS]",
+        help="Write this output for every source; repeat to decode once and write several, e.g. "
+             "--output-spec jpeg --output-spec webp:quality=70,max=1024,suffix=_preview "
+             "(options: quality, max, fit, resample, suffix). Overrides --format and the resize options",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=_pixels,
+        metavar="PIXELS",
+        help="Downscale so the output fits in a PIXELS x PIXELS box (never enlarges)",
+    )
+    parser.add_argument(
+        "--fit",
+        choices=FIT_MODES,
+        default="fit",
+        help="With --max-size: 'fit' inside the box, or 'fill' it and crop the overflow (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--resample",
+        choices=list(RESAMPLE_FILTERS),
+        default="lanczos",
+        help="Resampling filter used with --max-size (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--matte",
+        type=_color,
+        default=DEFAULT_MATTE,
+        help="Background for transparent areas in JPEG/BMP output, e.g. white, black or '#336699' (default: white)",
+    )
+    parser.add_argument("-o", "--output", default=".", help="Output folder (default: current directory)")
+    parser.add_argument(
+        "--name-template",
+        type=_template,
+        default=DEFAULT_TEMPLATE,
+        metavar="TEMPLATE",
+        help="Output file name, may include subfolders; fields: {stem} {source_ext} {parent} {suffix} {ext} "
+             "{format} (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--mirror", action="store_true",
+        help="Recreate the input folder structure in the output folder, so equal names in different folders don't collide",
+    )
+    parser.add_argument(
+        "--check-collisions", action="store_true",
+        help="List every input and check all output paths for collisions before converting anything "
+             "(streamed inputs are otherwise not checked against each other, to keep memory flat)",
+    )
+    parser.add_argument(
+        "--frames",
+        choices=FRAME_MODES,
+        help="Convert every image of HEIF bursts/sequences and every frame of animated or multi-page inputs: "
+             "'split' into numbered files, or 'stack' into one multi-page TIFF or animated WEBP/GIF/PNG "
+             "(default: primary image only)",
+    )
+    parser.add_argument(
+        "--dedupe",
+        choices=DEDUPE_MODES,
+        help="Convert sources with identical content once; 'skip' writes nothing for the duplicates, 'link' gives "
+             "them hard links to the original's outputs. Reads the input list upfront",
+    )
+    parser.add_argument(
+        "-j", "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: CPU count)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=1, help="Files per worker task (default: 1)")
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        metavar="MB",
+        help="Cap the estimated memory of conversions running at once; large images then run with fewer workers",
+    )
+    parser.add_argument(
+        "--no-recursive", dest="recursive", action="store_false",
+        help="Only convert files directly inside input directories",
+    )
+    parser.add_argument(
+        "--manifest",
+        metavar="PATH",
+        help="SQLite manifest for incremental runs; unchanged sources already converted are skipped",
+    )
+    parser.add_argument(
+        "--hash", action="store_true",
+        help="With --manifest, also compare content hashes so touched-but-unchanged files are skipped",
+    )
+    parser.add_argument(
+        "--state",
+        metavar="PATH",
+        help="Record finished sources in a JSON file so an interrupted run can be resumed; removed on completion",
+    )
+    parser.add_argument(
+        "--metrics-jsonl",
+        metavar="PATH",
+        help="Append one JSON record per file (outcome, bytes, per-stage seconds) to PATH",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        metavar="PATH",
+        help="Write aggregate counters and stage-time histograms to PATH in Prometheus text format",
+    )
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print the final summary")
+    return parser
+
+
+def main(argv: list | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    output = args.specs or OutputSpec(args.format, max_size=args.max_size, fit=args.fit, resample=args.resample)
+    if args.frames == "stack" and any(spec.format not in MULTI_FRAME_FORMATS for spec in as_specs(output)):
+        parser.error(f"--frames stack needs an output format of {', '.join(sorted(MULTI_FRAME_FORMATS))}")
+    files = iter_image_files(
+        args.inputs, recursive=args.recursive, on_error=(lambda message: None) if args.quiet else None
+    )
+    if args.check_collisions:
+        files = list(files)  # A sequence is planned upfront by convert_images
+    status_cb = None if args.quiet else print
+    manifest = None
+    if args.manifest:
+        from .manifest import Manifest  # sqlite3 is only needed with --manifest
+
+        manifest = Manifest(args.manifest, use_hash=args.hash)
+    metrics = ConversionMetrics() if args.metrics_prom else None
+    exporter = JsonLinesExporter(args.metrics_jsonl) if args.metrics_jsonl else None
+    try:
+        job = ConversionJob(
+            files,
+            output,
+            args.output,
+            state_path=args.state,
+            status_cb=status_cb,
+            workers=max(1, args.workers),
+            chunk_size=args.chunk_size,
+            memory_budget=args.memory_budget * 1024 * 1024 if args.memory_budget else None,
+            matte=args.matte,
+            template=args.name_template,
+            source_root=_input_root(args.inputs) if args.mirror else None,
+            dedupe=args.dedupe,
+            frames=args.frames,
+            manifest=manifest,
+            metrics=metrics,
+            on_file=exporter,
+        )
+        success, error = job.run()
+    except KeyboardInterrupt:
+        print("Interrupted." + (f" Resume with --state {args.state}" if args.state else ""), file=sys.stderr)
+        return 130
+    finally:
+        if manifest is not None:
+            manifest.close()
+        if exporter is not None:
+            exporter.close()
+    if metrics is not None:
+        metrics.write_prometheus(args.metrics_prom)
+    if not success and not error:
+        print("No input files found.", file=sys.stderr)
+        return 2
+    print(f"Conversion finished: {success} succeeded, {error} failed.")
+    return 1 if error else 0
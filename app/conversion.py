@@ -1,16 +1,155 @@
+import io
 import os
-from typing import Iterable, Callable, Tuple
+import secrets
+import time
+from collections.abc import Sized
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator, Callable, NamedTuple, Tuple
 from PIL import Image, UnidentifiedImageError
-import pillow_heif
 
-# Register HEIF/HEIC opener
-pillow_heif.register_heif_opener()
+from .events import (
+    ConversionEvent,
+    ConversionFinished,
+    ConversionProgress,
+    ConversionStarted,
+    FileDone,
+    FileFailed,
+)
+from .dedup import DEDUPE_MODES, find_duplicates, link_output
+from .heif import register_heif
+from .metrics import ConversionMetrics, FileStats, StageTimer
+from .planner import DEFAULT_TEMPLATE, OutputCollisionError, OutputPlanner, frame_path
+
+if TYPE_CHECKING:
+    from .manifest import Manifest
+    from .registry import ImageRegistry
 
 # Supported output formats (common ones)
 SUPPORTED_OUTPUT_FORMATS = [
     "PNG", "JPEG", "GIF", "BMP", "TIFF", "WEBP"
 ]
 
+# Encoder options passed to Image.save for each output format
+SAVE_OPTIONS = {
+    "JPEG": {"quality": 95, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 80, "lossless": False},
+    "GIF": {"optimize": True},
+    "TIFF": {"compression": "tiff_lzw"},
+}
+
+# Resampling filters selectable for the resize stage, by name
+RESAMPLE_FILTERS = {
+    "nearest": Image.Resampling.NEAREST,
+    "box": Image.Resampling.BOX,
+    "bilinear": Image.Resampling.BILINEAR,
+    "hamming": Image.Resampling.HAMMING,
+    "bicubic": Image.Resampling.BICUBIC,
+    "lanczos": Image.Resampling.LANCZOS,
+}
+# How a resized image meets its max_size x max_size box: "fit" inside it, or "fill" it and crop the overflow
+FIT_MODES = ("fit", "fill")
+# Image.resize shrinks by an integer factor with reduce() first while the remaining
+# scale stays at least this large: much faster, and indistinguishable at >= 3
+REDUCING_GAP = 3.0
+
+# Formats whose encoder takes a quality setting
+QUALITY_FORMATS = {"JPEG", "WEBP"}
+# Formats that store 16-bit greyscale (I;16) as it is; others get it scaled to 8 bits
+HIGH_BIT_DEPTH_FORMATS = {"PNG", "TIFF"}
+
+# Bytes per pixel of Pillow's in-memory storage (3-band images are padded to 4)
+_PIXEL_BYTES = {"1": 1, "L": 1, "P": 1, "I;16": 2, "I;16B": 2, "I;16L": 2, "I;16N": 2}
+# Background that transparent areas are composited over for formats without alpha
+DEFAULT_MATTE = (255, 255, 255)
+
+# How sources holding several images (HEIF bursts and sequences, animated GIF/WEBP/PNG,
+# multi-page TIFF) are converted: "split" writes each frame to its own numbered output,
+# "stack" writes all of them into one multi-page or animated output
+FRAME_MODES = ("split", "stack")
+# Output formats that can hold several frames (Image.save with save_all)
+MULTI_FRAME_FORMATS = {"TIFF", "WEBP", "GIF", "PNG"}
+
+
+
+class OutputSpec(NamedTuple):
+    """One output to produce from every source.
+
+    quality overrides the SAVE_OPTIONS quality for JPEG/WEBP and suffix is
+    appended to the output's base name, e.g. "_preview" writes
+    photo_preview.jpeg. max_size bounds the output to a max_size x max_size
+    box: with fit "fit" the longest edge is scaled to it, with "fill" the
+    shortest edge is, and the overflow is cropped around the centre. Images are
+    never enlarged. resample names one of RESAMPLE_FILTERS.
+    """
+
+    format: str
+    quality: int | None = None
+    max_size: int | None = None
+    suffix: str = ""
+    fit: str = "fit"
+    resample: str = "lanczos"
+
+    def save_options(self) -> dict:
+        options = dict(SAVE_OPTIONS.get(self.format.upper(), {}))
+        if self.quality is not None and self.format.upper() in QUALITY_FORMATS:
+            options["quality"] = self.quality
+        return options
+
+    def options(self, matte: tuple = DEFAULT_MATTE) -> dict:
+        """Everything besides the source that determines this output. Keys manifests and job state."""
+        options = self.save_options()
+        if tuple(matte) != DEFAULT_MATTE:
+            options["matte"] = list(matte)
+        if self.max_size:
+            options["max_size"] = self.max_size
+            if self.fit != "fit":
+                options["fit"] = self.fit
+            if self.resample != "lanczos":
+                options["resample"] = self.resample
+        if self.suffix:
+            options["suffix"] = self.suffix
+        return options
+
+
+def as_specs(output: "str | OutputSpec | Iterable[str | OutputSpec]") -> list:
+    """Normalize a format name, a single OutputSpec or a recipe (several of either) to a list of specs."""
+    if isinstance(output, (str, OutputSpec)):
+        output = [output]
+    specs = [OutputSpec(spec) if isinstance(spec, str) else spec for spec in output]
+    if not specs:
+        raise ValueError("At least one output is required")
+    for spec in specs:
+        if spec.max_size is not None and spec.max_size <= 0:
+            raise ValueError(f"Max size must be a positive number of pixels: {spec.max_size!r}")
+        if spec.fit not in FIT_MODES:
+            raise ValueError(f"Unknown fit mode: {spec.fit!r}")
+        if spec.resample not in RESAMPLE_FILTERS:
+            raise ValueError(f"Unknown resampling filter: {spec.resample!r}")
+    return specs
+
+
+def decoded_nbytes(mode: str, size: tuple) -> int:
+    """Memory Pillow uses for a decoded image of this mode and size."""
+    return size[0] * size[1] * _PIXEL_BYTES.get(mode, 4)
+
+
+def estimate_peak_bytes(file_path: str, outputs: int = 1) -> int:
+    """Estimate the peak memory of converting file_path, from its header only.
+
+    Counts the decode plus one converted copy per output, as outputs are
+    encoded concurrently. Returns 0 if the header can't be read; the
+    conversion itself reports that error.
+    """
+    register_heif()
+    try:
+        with Image.open(file_path) as img:
+            return (1 + outputs) * decoded_nbytes(img.mode, img.size)
+    except Exception:
+        return 0
+
 
 def get_compatible_formats(image_obj: Image.Image) -> list:
     """Return formats compatible with the given PIL image."""
@@ -18,18 +157,19 @@ def get_compatible_formats(image_obj: Image.Image) -> list:
         return []
 
     mode = image_obj.mode
+    high_bit_depth = mode.startswith("I;16")  # Scaled to L for formats without 16-bit greyscale
     compatible_formats = []
     for fmt in SUPPORTED_OUTPUT_FORMATS:
         fmt_upper = fmt.upper()
         if fmt_upper in {"PNG", "WEBP", "TIFF"}:
             compatible_formats.append(fmt)
         elif fmt_upper == "JPEG":
-            if mode in ("L", "RGB", "RGBA", "LA", "PA", "CMYK"):
+            if mode in ("L", "RGB", "RGBA", "LA", "PA", "CMYK") or high_bit_depth:
                 compatible_formats.append(fmt)
             elif mode == "P" and image_obj.palette and image_obj.palette.mode in {"L", "RGB"}:
                 compatible_formats.append(fmt)
         elif fmt_upper == "BMP":
-            if mode in ("L", "RGB", "RGBA", "LA", "PA", "P"):
+            if mode in ("L", "RGB", "RGBA", "LA", "PA", "P") or high_bit_depth:
                 compatible_formats.append(fmt)
         elif fmt_upper == "GIF":
             compatible_formats.append(fmt)
@@ -37,125 +177,989 @@ def get_compatible_formats(image_obj: Image.Image) -> list:
     return list(dict.fromkeys(compatible_formats))
 
 
+def load_image(
+    file_path: str,
+    timer: StageTimer | None = None,
+    reduce_for: Callable[[tuple], tuple] | None = None,
+) -> Image.Image:
+    """Open and fully decode file_path. The returned image holds no open file handle.
+
+    HEIC/HEIF files are decoded in one pass with pillow_heif (see _decode_heif)
+    rather than through its Pillow plugin. With a timer, the open and load
+    stages, or heif_decode for HEIF, are timed. reduce_for(size) may return
+    the smallest size the caller needs; JPEGs are then decoded at the
+    coarsest DCT scale still covering it (Image.draft).
+    """
+    return _decode(file_path, file_path.lower().endswith((".heic", ".heif")), timer or StageTimer(), reduce_for)
+
+
+def load_image_bytes(data: bytes | bytearray | memoryview | BinaryIO, timer: StageTimer | None = None) -> Image.Image:
+    """Decode an encoded image held in memory or readable from a binary stream.
+
+    Like load_image, but HEIF content is recognised by its ftyp box rather than
+    by a file name. Streams must be seekable and hold only the image: it is
+    read from offset 0, whatever the current position.
+    """
+    stream = _as_stream(data)
+    return _decode(stream, _is_heif_stream(stream), timer or StageTimer())
+
+
+def _as_stream(data: bytes | bytearray | memoryview | BinaryIO) -> BinaryIO:
+    return io.BytesIO(data) if isinstance(data, (bytes, bytearray, memoryview)) else data
+
+
+def _is_heif_stream(stream: BinaryIO) -> bool:
+    """True if the stream starts with an ISO-BMFF ftyp box. The position is restored."""
+    start = stream.tell()
+    stream.seek(0)  # Decoders read from offset 0 too
+    head = stream.read(12)
+    stream.seek(start)
+    return head[4:8] == b"ftyp"
+
+
+def _decode(
+    source: str | BinaryIO,
+    is_heif: bool,
+    timer: StageTimer,
+    reduce_for: Callable[[tuple], tuple] | None = None,
+) -> Image.Image:
+    """Decode source (a path or a seekable binary stream); see load_image."""
+    if is_heif:
+        img = _decode_heif(source, timer)
+        if img is not None:
+            return img
+    register_heif()  # A HEIF file under another name still opens through the plugin
+    with timer.stage("open"):
+        img = Image.open(source)
+        if reduce_for is not None and img.format == "JPEG":
+            img.draft(img.mode, reduce_for(img.size))
+    with img:
+        with timer.stage("load"):
+            img.load()
+    return img
+
+
+def _decode_heif(source: str | BinaryIO, timer: StageTimer) -> Image.Image | None:
+    """Decode the primary image of a HEIF file with pillow_heif, or return None if source isn't one.
+
+    The file is decoded once and the decoded buffer is wrapped with
+    Image.frombuffer: RGBA, L and 16-bit monochrome (I;16, from 10/12-bit
+    files) are mapped without copying, RGB needs one unpack as Pillow keeps
+    RGB at 4 bytes per pixel. Alpha and 16-bit monochrome are kept as they
+    are; 10/12-bit colour is reduced to 8 bits by libheif, since Pillow has
+    no 16-bit RGB mode. The result is read-only until first modified (Pillow
+    copies it then) and is oriented like the plugin's, with the EXIF
+    orientation reset. Streams are read from offset 0, as by Image.open: like
+    Pillow, pillow_heif seeks to the start whatever the current position.
+    """
+    pillow_heif = register_heif()
+    with timer.stage("heif_decode"):
+        start = None if isinstance(source, str) else source.tell()
+        supported = pillow_heif.is_supported(source)
+        if start is not None:
+            source.seek(start)
+        if not supported:
+            return None
+        try:
+            heif_file = pillow_heif.open_heif(source)
+        except ValueError as exc:  # Reported like the plugin's failures to open
+            raise UnidentifiedImageError(f"cannot identify HEIF image: {exc}") from exc
+        img = _map_heif(heif_file)
+        img.format = "HEIF"  # As Image.open reports it
+        img.info = dict(heif_file.info)
+        img.info["original_orientation"] = pillow_heif.set_orientation(img.info)
+    return img
+
+
+def _map_heif(heif_image) -> Image.Image:
+    """Wrap a decoded pillow_heif image (HeifFile or HeifImage) without copying its pixels."""
+    img = Image.frombuffer(
+        heif_image.mode, heif_image.size, heif_image.data, "raw", heif_image.mode, heif_image.stride, 1
+    )
+    if img.readonly:
+        # Mapped: the buffer belongs to libheif's image and is freed with it, not with the memoryview.
+        # Copied (RGB) images don't need it, and keeping it would hold the decode twice.
+        img._heif_image = heif_image
+    return img
+
+
+def _prepare_for_format(
+    img: Image.Image,
+    output_fmt: str,
+    is_heic: bool = False,
+    timer: StageTimer | None = None,
+    matte: tuple = DEFAULT_MATTE,
+) -> Image.Image:
+    """Return img converted to a mode output_fmt can store, flattening alpha for JPEG/BMP.
+
+    Transparent areas are composited over matte (an RGB tuple) for formats
+    without alpha. img itself is never modified. With a timer, the convert and
+    flatten stages are timed.
+    """
+    timer = timer or StageTimer()
+    with timer.stage("convert"):
+        img, needs_flatten = _convert_mode(img, output_fmt, is_heic)
+    if needs_flatten:
+        with timer.stage("flatten"):
+            img = _flatten(img, matte)
+    return img
+
+
+def _convert_mode(img: Image.Image, output_fmt: str, is_heic: bool) -> tuple:
+    """Mode conversion ahead of encoding. Returns (image, needs_flatten).
+
+    Images to be flattened are returned as they are; _flatten expands them itself.
+    """
+    if is_heic and img.mode not in ("RGB", "RGBA", "L", "I;16"):
+        img = img.convert("RGB")
+
+    fmt = output_fmt.upper()
+    if img.mode.startswith("I;16") and fmt not in HIGH_BIT_DEPTH_FORMATS:
+        # Pillow's I;16 to L conversion clips instead of scaling: map 0-65535 onto 0-255 first
+        img = img.point(lambda value: value / 256).convert("L")
+    if fmt in ("JPEG", "BMP") and (img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info):
+        return img, True
+
+    if img.mode == "P":
+        if "transparency" in img.info:
+            img = img.convert("RGBA")
+        elif fmt in ("JPEG", "BMP"):
+            img = img.convert("RGB")
+    elif img.mode == "LA":
+        img = img.convert("RGBA")
+
+    if fmt == "BMP" and img.mode != "RGB":
+        img = img.convert("RGB")
+    elif fmt == "JPEG" and img.mode not in ("RGB", "L", "CMYK"):
+        img = img.convert("RGB")
+
+    return img, False
+
+
+def _flatten(img: Image.Image, matte: tuple = DEFAULT_MATTE) -> Image.Image:
+    """Composite img over a solid matte colour, returning an RGB image.
+
+    RGBA and LA images are pasted onto the matte in a single pass with their own
+    alpha as the mask, so the only new full-size image is the result. Other
+    transparent modes (PA, or P/L/RGB with a transparency key) are expanded to
+    RGBA first. Failures propagate rather than silently dropping alpha.
+    """
+    if img.mode not in ("RGBA", "LA"):
+        img = img.convert("RGBA")
+    bg = Image.new("RGB", img.size, matte)
+    bg.paste(img, (0, 0), img)
+    return bg
+
+
+def _target_size(size: tuple, spec: OutputSpec) -> tuple:
+    """Size before cropping that spec scales a size-sized image to: never larger than size."""
+    if not spec.max_size:
+        return size
+    edge = max(size) if spec.fit == "fit" else min(size)
+    scale = min(1.0, spec.max_size / edge)
+    return (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+
+
+def _draft_size(size: tuple, specs: list) -> tuple:
+    """The smallest decode size from which every spec can still be produced."""
+    targets = [_target_size(size, spec) for spec in specs]
+    return (max(t[0] for t in targets), max(t[1] for t in targets))
+
+
+def _resize(img: Image.Image, spec: OutputSpec, timer: StageTimer | None = None) -> Image.Image:
+    """Apply spec's max_size/fit/resample to img; img is not modified.
+
+    Large reductions go through Image.reduce first (see REDUCING_GAP). Palette
+    and bilevel images are expanded first, since Pillow can only resample them
+    with nearest neighbour.
+    """
+    if not spec.max_size:
+        return img
+    box = (spec.max_size, spec.max_size)
+    target = _target_size(img.size, spec)
+    crop_size = (min(target[0], box[0]), min(target[1], box[1])) if spec.fit == "fill" else target
+    if target == img.size and crop_size == img.size:
+        return img
+    timer = timer or StageTimer()
+    with timer.stage("resize"):
+        if img.mode in ("P", "PA", "1"):
+            transparent = img.mode == "PA" or "transparency" in img.info
+            img = img.convert("RGBA" if transparent else "RGB" if img.mode != "1" else "L")
+        # Source region that maps onto crop_size at the target scale, centred
+        scale_x, scale_y = img.width / target[0], img.height / target[1]
+        left = (target[0] - crop_size[0]) / 2 * scale_x
+        top = (target[1] - crop_size[1]) / 2 * scale_y
+        region = (left, top, left + crop_size[0] * scale_x, top + crop_size[1] * scale_y)
+        return img.resize(
+            crop_size, RESAMPLE_FILTERS[spec.resample], box=region, reducing_gap=REDUCING_GAP
+        )
+
+
+def _convert_file(
+    file_path: str,
+    spec: OutputSpec,
+    output_path: str,
+    load: Callable[..., Image.Image] = load_image,
+    matte: tuple = DEFAULT_MATTE,
+) -> FileStats:
+    """Convert a single file to output_path and report what happened."""
+    return _convert_outputs(file_path, [spec], [output_path], load, matte)[0]
+
+
+def _convert_outputs(
+    file_path: str,
+    specs: list,
+    outputs: list,
+    load: Callable[..., Image.Image] = load_image,
+    matte: tuple = DEFAULT_MATTE,
+    written_since: float | None = None,
+) -> list:
+    """Decode file_path once and write one output per OutputSpec, to the matching path in outputs.
+
+    Returns a FileStats per spec.
+
+    load decodes the source; pass e.g. ImageRegistry.image to reuse an image
+    that is already decoded. The loaded image is not modified. Several specs
+    are encoded concurrently on threads, as Pillow releases the GIL while
+    resizing and encoding. The decode is accounted to the first spec's stats
+    (bytes_in, open/load stages), the rest only carry their own encode.
+
+    When load is load_image the decode is owned here and released as soon as
+    it is no longer needed; with a single spec that is before encoding, so the
+    encoder does not run with both copies in memory.
+
+    written_since is passed on to _atomic_file.
+    """
+    filename = os.path.basename(file_path)
+    results = [FileStats(source=file_path) for _ in specs]
+    first = results[0]
+    timer = StageTimer()
+    start = time.perf_counter()
+
+    def fail(message: str, error_class: str) -> list:
+        for stats in results:
+            stats.message = message
+            stats.error_class = error_class
+        return results
+
+    if not os.path.exists(file_path):
+        return fail(f"Skipped {filename}: not found", "FileNotFoundError")
+
+    decoded = None
+    try:
+        first.bytes_in = os.path.getsize(file_path)
+        is_heic = file_path.lower().endswith((".heic", ".heif"))
+        if load is load_image:
+            decoded = load_image(file_path, timer, lambda size: _draft_size(size, specs))
+        else:
+            decoded = load(file_path, timer=timer)
+    except UnidentifiedImageError as exc:
+        fail(
+            f"Cannot decode HEIC: {filename}" if file_path.lower().endswith((".heic", ".heif"))
+            else f"Cannot identify image file: {filename}",
+            type(exc).__name__,
+        )
+    except Exception as exc:
+        fail(f"Error converting {filename}: {type(exc).__name__}", type(exc).__name__)
+    finally:
+        first.seconds = time.perf_counter() - start
+        first.stages = timer.stages
+    if decoded is None:
+        return results
+
+    owned = load is load_image
+    if len(specs) == 1:
+        _encode_output(decoded, file_path, specs[0], outputs[0], is_heic, matte, first, owned, written_since)
+    else:
+        with ThreadPoolExecutor(max_workers=len(specs), thread_name_prefix="encode") as pool:
+            for spec, output_path, stats in zip(specs, outputs, results):
+                pool.submit(
+                    _encode_output, decoded, file_path, spec, output_path, is_heic, matte, stats, False, written_since
+                )
+        if owned:
+            decoded.close()
+    return results
+
+
+def _encode_output(
+    decoded: Image.Image,
+    file_path: str,
+    spec: OutputSpec,
+    output_path: str,
+    is_heic: bool,
+    matte: tuple,
+    stats: FileStats,
+    release: bool = False,
+    written_since: float | None = None,
+) -> None:
+    """Convert decoded for spec and save it to output_path, recording the outcome in stats.
+
+    With release, decoded is closed as soon as a converted copy exists.
+    """
+    filename = os.path.basename(file_path)
+    timer = StageTimer()
+    start = time.perf_counter()
+    try:
+        img = _prepare_for_format(_resize(decoded, spec, timer), spec.format, is_heic, timer, matte)
+        if release and img is not decoded:
+            decoded.close()
+        del decoded
+        with timer.stage("save"):
+            _save_atomic(img, output_path, spec.format, spec.save_options(), written_since)
+        del img
+        stats.ok = True
+        stats.output = output_path
+        stats.bytes_out = os.path.getsize(output_path)
+    except OutputCollisionError as exc:
+        stats.error_class = type(exc).__name__
+        stats.message = f"Skipped {filename}: {exc}"
+    except Exception as exc:
+        stats.error_class = type(exc).__name__
+        stats.message = f"Error converting {filename}: {type(exc).__name__}"
+    finally:
+        stats.seconds += time.perf_counter() - start
+        stats.stages.update(timer.stages)
+
+
+def _load_frame(img: Image.Image | None, index: int, file_path: str, timer: StageTimer) -> Image.Image:
+    """Decode frame index of img, opened from file_path, or of the HEIF file file_path without img.
+
+    HEIF files are reopened for every frame rather than decoded through one
+    HeifFile (or the Pillow plugin, which wraps one): it keeps every frame it
+    decoded until closed, while here the frame's memory is freed with it.
+    Opening only parses the container, so that costs little.
+    """
+    if img is not None:
+        with timer.stage("load"):
+            img.seek(index)
+            img.load()
+        return img
+    pillow_heif = register_heif()
+    with timer.stage("heif_decode"):
+        try:
+            heif_image = pillow_heif.open_heif(file_path)[index]
+            frame = _map_heif(heif_image)
+        except ValueError as exc:  # As in _decode_heif
+            raise UnidentifiedImageError(f"cannot identify HEIF image: {exc}") from exc
+        frame.info = dict(heif_image.info)
+        frame.info["original_orientation"] = pillow_heif.set_orientation(frame.info)
+    return frame
+
+
+def _convert_frames(
+    file_path: str,
+    specs: list,
+    outputs: list,
+    frames: str,
+    matte: tuple = DEFAULT_MATTE,
+    written_since: float | None = None,
+) -> list:
+    """Like _convert_outputs, but for every frame of file_path (see FRAME_MODES).
+
+    Frames are decoded one at a time (HEIF frames with pillow_heif, see
+    _load_frame) and each is converted for every spec before the next is
+    decoded. In split mode, and when stacking into TIFF (pages are appended
+    as they come), only one decoded frame is held. The
+    WEBP, GIF and PNG encoders need every frame at once, so stacking into
+    them holds all converted frames until the output is written. Each output
+    is written atomically; in split mode each frame is. A failure fails every
+    output of the source. The whole conversion is accounted to the first
+    spec's stats.
+    """
+    filename = os.path.basename(file_path)
+    results = [FileStats(source=file_path) for _ in specs]
+    first = results[0]
+    timer = StageTimer()
+    start = time.perf_counter()
+    if not os.path.exists(file_path):
+        for stats in results:
+            stats.message = f"Skipped {filename}: not found"
+            stats.error_class = "FileNotFoundError"
+        return results
+
+    is_heic = file_path.lower().endswith((".heic", ".heif"))
+    img = None
+    try:
+        first.bytes_in = os.path.getsize(file_path)
+        pillow_heif = register_heif()
+        with timer.stage("open"):
+            if pillow_heif.is_supported(file_path):
+                try:
+                    count = len(pillow_heif.open_heif(file_path))
+                except ValueError as exc:  # As in _decode_heif
+                    raise UnidentifiedImageError(f"cannot identify HEIF image: {exc}") from exc
+            else:
+                img = Image.open(file_path)
+                count = getattr(img, "n_frames", 1)
+        with ExitStack() as stack:
+            if img is not None:
+                stack.enter_context(img)
+            pages = []  # Per spec: an AppendingTiffWriter or the list of frames held for save_all
+            if frames == "stack":
+                for spec, output_path in zip(specs, outputs):
+                    if spec.format.upper() == "TIFF":
+                        from PIL import TiffImagePlugin
+
+                        fh = stack.enter_context(_atomic_file(output_path, written_since))
+                        pages.append(stack.enter_context(TiffImagePlugin.AppendingTiffWriter(fh)))
+                    else:
+                        pages.append([])
+            for index in range(count):
+                frame = _load_frame(img, index, file_path, timer)
+                for i, (spec, output_path) in enumerate(zip(specs, outputs)):
+                    converted = _prepare_for_format(_resize(frame, spec, timer), spec.format, is_heic, timer, matte)
+                    with timer.stage("save"):
+                        if frames == "split":
+                            _save_atomic(
+                                converted, frame_path(output_path, index, count), spec.format, spec.save_options(),
+                                written_since,
+                            )
+                        elif isinstance(pages[i], list):
+                            pages[i].append(converted.copy() if converted is img else converted)
+                        else:
+                            converted.save(pages[i], format="TIFF", **spec.save_options())
+                            pages[i].newFrame()
+                del frame, converted
+            with timer.stage("save"):
+                for spec, output_path, held in zip(specs, outputs, pages):
+                    if isinstance(held, list):
+                        durations = [page.info.get("duration") for page in held]
+                        if len({page.mode for page in held}) > 1:
+                            # Frames of one animation must share a mode; a GIF's first frame is P, the rest RGB(A)
+                            alpha = any(page.mode in ("RGBA", "LA", "PA") or "transparency" in page.info
+                                        for page in held)
+                            for i, page in enumerate(held):
+                                held[i] = page.convert("RGBA" if alpha else "RGB")
+                        options = dict(spec.save_options(), save_all=True, append_images=held[1:])
+                        if None not in durations:
+                            options["duration"] = durations
+                        _save_atomic(held[0], output_path, spec.format, options, written_since)
+                        held.clear()
+        for spec, output_path, stats in zip(specs, outputs, results):
+            stats.ok = True
+            stats.frames = count
+            paths = [output_path] if frames == "stack" else [frame_path(output_path, i, count) for i in range(count)]
+            stats.output = paths[0]
+            stats.bytes_out = sum(os.path.getsize(path) for path in paths)
+    except Exception as exc:
+        for stats in results:
+            stats.error_class = type(exc).__name__
+            stats.message = (
+                f"Skipped {filename}: {exc}" if isinstance(exc, OutputCollisionError)
+                else f"Cannot decode HEIC: {filename}" if isinstance(exc, UnidentifiedImageError) and is_heic
+                else f"Cannot identify image file: {filename}" if isinstance(exc, UnidentifiedImageError)
+                else f"Error converting {filename}: {type(exc).__name__}"
+            )
+    finally:
+        first.seconds = time.perf_counter() - start
+        first.stages = timer.stages
+    return results
+
+
+def convert_bytes(
+    data: bytes | bytearray | memoryview | BinaryIO,
+    output_fmt: str | OutputSpec,
+    out: BinaryIO | None = None,
+    matte: tuple = DEFAULT_MATTE,
+) -> bytes | None:
+    """Convert an encoded image in memory to output_fmt (a format name or an OutputSpec), without touching the disk.
+
+    data may be bytes, a memoryview or a seekable binary stream holding only
+    the image (read from offset 0, see load_image_bytes). The result is
+    encoded with the same mode handling and SAVE_OPTIONS as convert_images and
+    is returned as bytes, or written to out (returning None) if given.
+    Decode and encode errors propagate (UnidentifiedImageError, OSError, ...).
+    """
+    spec = as_specs(output_fmt)[0]
+    stream = _as_stream(data)
+    is_heic = _is_heif_stream(stream)
+    img = _decode(stream, is_heic, StageTimer(), lambda size: _draft_size(size, [spec]))
+    img = _prepare_for_format(_resize(img, spec), spec.format, is_heic, matte=matte)
+    target = out if out is not None else io.BytesIO()
+    img.save(target, format=spec.format, **spec.save_options())
+    return None if out is not None else target.getvalue()
+
+
+def _save_atomic(
+    img: Image.Image, output_path: str, output_fmt: str, save_kwargs: dict, written_since: float | None = None
+) -> None:
+    """Save via a temporary file in the same folder, so output_path is never left truncated."""
+    with _atomic_file(output_path, written_since) as fh:
+        img.save(fh, format=output_fmt, **save_kwargs)
+
+
+@contextmanager
+def _atomic_file(output_path: str, written_since: float | None = None) -> Iterator[BinaryIO]:
+    """A temporary file (opened w+b) that is renamed to output_path if the block succeeds.
+
+    The temporary name is random and created exclusively, so concurrent
+    writers (threads, processes or machines sharing the output folder) never
+    write into each other's file; the last rename wins. On error it is
+    removed. Missing parent folders are created.
+
+    With written_since (a time.time() value, normally the start of the run),
+    an output_path modified since then is not replaced: OutputCollisionError
+    is raised instead. This catches two sources of one run written to the
+    same path without remembering any paths. A new output_path is created
+    with a hard link, which fails if another writer created it first; where
+    hard links aren't supported it is renamed into place like any other.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.{secrets.token_hex(8)}.tmp"
+    try:
+        flags = os.O_RDWR | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+        with os.fdopen(os.open(tmp_path, flags, 0o666), "w+b") as fh:
+            yield fh
+        if written_since is None:
+            os.replace(tmp_path, output_path)
+        else:
+            _replace_unless_written(tmp_path, output_path, written_since)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _replace_unless_written(tmp_path: str, output_path: str, written_since: float) -> None:
+    """Move tmp_path to output_path unless output_path was modified since written_since; see _atomic_file."""
+    try:
+        st = os.stat(output_path)
+    except FileNotFoundError:
+        try:
+            os.link(tmp_path, output_path)
+        except FileExistsError:
+            raise OutputCollisionError({output_path: []}) from None
+        except OSError:
+            os.replace(tmp_path, output_path)  # No hard links here (FAT, some network shares)
+        else:
+            os.remove(tmp_path)
+        return
+    if st.st_mtime >= written_since:
+        raise OutputCollisionError({output_path: []})
+    os.replace(tmp_path, output_path)
+
+
+def _convert_chunk(
+    chunk: list,
+    specs: list,
+    matte: tuple = DEFAULT_MATTE,
+    frames: str | None = None,
+    written_since: float | None = None,
+) -> list:
+    """Worker entry point: convert a chunk of (file, output paths) pairs.
+
+    Returns one list of FileStats (one per spec) per file.
+    """
+    if frames is not None:
+        return [
+            _convert_frames(file_path, specs, outputs, frames, matte, written_since) for file_path, outputs in chunk
+        ]
+    return [_convert_outputs(file_path, specs, outputs, matte=matte, written_since=written_since)
+            for file_path, outputs in chunk]
+
+
+def _progress_label(count: int, total: int | None) -> str:
+    return f"{count}/{total}" if total is not None else f"{count} done"
+
+
+def _convert_parallel(
+    files: Iterable[tuple],
+    specs: list,
+    workers: int,
+    chunk_size: int,
+    max_in_flight: int | None,
+    on_result: Callable[[list], None],
+    checkpoint: Callable[[], bool] | None = None,
+    memory_budget: int | None = None,
+    matte: tuple = DEFAULT_MATTE,
+    frames: str | None = None,
+    written_since: float | None = None,
+) -> bool:
+    """Fan conversions out over a process pool, keeping at most max_in_flight chunks queued.
+
+    files yields (source, output paths) pairs. Chunks are pulled lazily from
+    it, so only the in-flight window is held in memory. on_result(results),
+    with a FileStats per spec, is called for each file in completion order.
+    checkpoint is called before each chunk is submitted; if it returns False,
+    queued chunks are cancelled, running ones are finished, and False is
+    returned. frames selects _convert_frames over _convert_outputs, and
+    written_since is passed on to them.
+
+    With memory_budget, chunks are also held back while the estimated peak
+    memory of everything submitted (see estimate_peak_bytes; a chunk costs as
+    much as its largest file) would exceed it. A chunk over budget on its own
+    is submitted once nothing else is in flight.
+
+    If a worker dies (killed for memory, a crash in a decoder), every chunk
+    in flight on the pool fails with BrokenProcessPool and the remaining
+    chunks go to a new pool.
+    """
+
+    chunk_size = max(1, chunk_size)
+    window = max(1, max_in_flight or workers * 2)
+    files_iter = iter(files)
+    pending: dict[Future, list] = {}
+    costs: dict[Future, int] = {}
+    in_flight_bytes = 0
+
+    def collect(finished) -> None:
+        nonlocal in_flight_bytes
+        for future in finished:
+            chunk = pending.pop(future)
+            in_flight_bytes -= costs.pop(future)
+            if future.cancelled():
+                continue
+            try:
+                results = future.result()
+            except Exception as exc:  # Includes BrokenProcessPool for every chunk of a pool that broke
+                results = [
+                    [
+                        FileStats(
+                            source=p,
+                            message=f"Error converting {os.path.basename(p)}: {type(exc).__name__}",
+                            error_class=type(exc).__name__,
+                        )
+                        for _ in specs
+                    ]
+                    for p, _ in chunk
+                ]
+            for file_results in results:
+                on_result(file_results)
+
+    # Pull in multiprocessing only when a pool is needed
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    # Workers are spawned, not forked: the caller may be running threads (the GUI's Tk loop and
+    # thumbnail loaders), and a forked child can deadlock on a lock one of them held
+    context = multiprocessing.get_context("spawn")
+
+    completed = True
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    try:
+        while True:
+            if checkpoint is not None and not checkpoint():
+                completed = False
+                for future in pending:
+                    future.cancel()
+                break
+            chunk = list(islice(files_iter, chunk_size))
+            if not chunk:
+                break
+            cost = max(estimate_peak_bytes(p, len(specs)) for p, _ in chunk) if memory_budget else 0
+            while pending and (
+                len(pending) >= window or (memory_budget and in_flight_bytes + cost > memory_budget)
+            ):
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            try:
+                future = pool.submit(_convert_chunk, chunk, specs, matte, frames, written_since)
+            except BrokenProcessPool:
+                # Everything in flight failed with the pool; carry on with a fresh one
+                if pending:
+                    collect(wait(pending)[0])
+                pool.shutdown()
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+                future = pool.submit(_convert_chunk, chunk, specs, matte, frames, written_since)
+            pending[future] = chunk
+            costs[future] = cost
+            in_flight_bytes += cost
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(finished)
+    finally:
+        pool.shutdown()
+    return completed
+
+
 def convert_images(
     files: Iterable[str],
-    output_fmt: str,
+    output_fmt: "str | OutputSpec | Iterable[str | OutputSpec]",
     out_folder: str,
     status_cb: Callable[[str], None] | None = None,
+    workers: int = 1,
+    chunk_size: int = 1,
+    max_in_flight: int | None = None,
+    manifest: "Manifest | None" = None,
+    registry: "ImageRegistry | None" = None,
+    metrics: ConversionMetrics | None = None,
+    on_file: Callable[[FileStats], None] | None = None,
+    on_event: Callable[[ConversionEvent], None] | None = None,
+    checkpoint: Callable[[], bool] | None = None,
+    memory_budget: int | None = None,
+    matte: tuple = DEFAULT_MATTE,
+    template: str = DEFAULT_TEMPLATE,
+    source_root: str | None = None,
+    dedupe: str | None = None,
+    frames: str | None = None,
+    check_collisions: bool = False,
 ) -> Tuple[int, int]:
-    """Convert a sequence of image files. Returns (success_count, error_count)."""
+    """Convert a sequence of image files. Returns (success_count, error_count).
 
-    success_count = 0
-    error_count = 0
-    total_files = len(list(files)) if not isinstance(files, list) else len(files)
-    files_list = list(files)
+    output_fmt is a format name, or a recipe: a list of OutputSpec (format,
+    quality, max size, suffix). Each source is decoded once per recipe and its
+    outputs are encoded concurrently. Counts, FileStats and the manifest are
+    per output; progress is per source.
+
+    files may be any iterable, including a lazy generator such as
+    inputs.iter_image_files; it is consumed once and never materialized, and
+    progress is reported as "N done" when its length is unknown.
+
+    With workers > 1 the files are converted in a process pool, submitted in
+    chunks of chunk_size files with at most max_in_flight chunks outstanding
+    (defaults to twice the worker count). Progress messages are reported in
+    completion order. memory_budget (bytes) additionally caps the estimated
+    peak memory of the conversions in flight, so a batch of very large images
+    runs with fewer of them at once instead of exhausting RAM. Workers are
+    started with "spawn" on every platform, so a script calling this with
+    workers > 1 needs an if __name__ == "__main__" guard.
+
+    matte is the RGB colour transparent areas are composited over for formats
+    without alpha (JPEG, BMP).
+
+    Output paths come from a planner.OutputPlanner: template names each
+    output and, with source_root, the source's folder below source_root is
+    mirrored in out_folder. When files is a sequence, every path is planned
+    before anything is converted and if two sources would be written to the
+    same path nothing is converted: ConversionFinished carries the error and
+    every file counts as failed. A lazy iterable is only checked with
+    check_collisions, as it is consumed: a source whose output was already
+    claimed by another fails on its own. That remembers every output path of
+    the run, so memory grows with the number of files. Without it, memory
+    stays flat and the clash is found when writing instead (see
+    _atomic_file): an output modified since the run started is not
+    replaced, and the source that would have replaced it fails.
+
+    By default only the primary image of a source is converted. With frames
+    ("split" or "stack", see FRAME_MODES) every image of HEIF containers
+    (bursts, sequences) and every frame of animated or multi-page inputs is,
+    streamed frame by frame (see _convert_frames). Split outputs are
+    numbered after the planned path (photo_1.png, photo_2.png, ...; see
+    planner.frame_path), and these names are reserved when planning, so a
+    source that would be written to one of them is a collision.
+
+    With dedupe ("skip" or "link", see dedup.DEDUPE_MODES), files is read
+    into a list and sources with identical content (dedup.find_duplicates)
+    are converted once. Once the rest are done, every duplicate is reported
+    with duplicate_of set and counted as a success if its original was:
+    "skip" writes nothing for it, "link" hard-links its outputs to the
+    original's.
+
+    With a manifest, sources that were already converted with the same format
+    and options and have not changed since are skipped and counted as
+    successes; every successful conversion is recorded in it.
+
+    With a registry, sources are decoded through it so images already decoded
+    this session (e.g. for previews) are not decoded again. In parallel mode
+    only sources it already holds are converted in-process; the rest go to the
+    pool as usual.
+
+    Every file, skipped ones included, is reported as a FileStats with
+    per-stage timings: aggregated into metrics and passed to on_file (e.g. a
+    metrics.JsonLinesExporter), both optional.
+
+    on_event receives typed events (see events.py): ConversionStarted, then
+    FileDone or FileFailed followed by ConversionProgress for every file, then
+    ConversionFinished. It is called on the calling thread at file throughput;
+    wrap it in events.ProgressThrottle to coalesce progress for a UI. status_cb
+    receives the same progress as preformatted strings.
+
+    checkpoint, if given, is called before each file (before each chunk
+    submission in parallel mode) and may block, e.g. while a job is paused.
+    Returning False stops the run: files not yet started are left alone and
+    ConversionFinished is emitted with cancelled set. See jobs.ConversionJob.
+    Outputs are written to a temporary file and renamed into place, so an
+    interrupted run never leaves a truncated output.
+    """
+
+    specs = as_specs(output_fmt)
+    planner = OutputPlanner(out_folder, template, source_root, split_frames=frames == "split")
+    if dedupe is not None and dedupe not in DEDUPE_MODES:
+        raise ValueError(f"Unknown dedupe mode: {dedupe!r}")
+    if frames is not None and frames not in FRAME_MODES:
+        raise ValueError(f"Unknown frame mode: {frames!r}")
+    if frames == "stack":
+        for spec in specs:
+            if spec.format.upper() not in MULTI_FRAME_FORMATS:
+                formats = ", ".join(sorted(MULTI_FRAME_FORMATS))
+                raise ValueError(f"{spec.format} can't hold several frames; stack into one of {formats}")
+    duplicate_of = {}
+    if dedupe is not None:
+        files, duplicate_of = find_duplicates(files)
+    total_files = len(files) + len(duplicate_of) if isinstance(files, Sized) else None
+    started = time.perf_counter()
+    wall_started = time.time()
+
+    def emit(event: ConversionEvent) -> None:
+        if on_event is not None:
+            on_event(event)
+
+    def abort(message: str) -> Tuple[int, int]:
+        if status_cb:
+            status_cb(message)
+        failed = total_files if total_files is not None else sum(1 for _ in files)
+        emit(ConversionFinished(0, failed, time.perf_counter() - started, error=message))
+        return (0, failed)
+
+    emit(ConversionStarted(total_files))
+
+    if total_files is not None:
+        try:
+            planner.plan([*files, *duplicate_of], specs)
+        except OutputCollisionError as exc:
+            return abort(f"Output name collision: {exc}")
 
     if not os.path.isdir(out_folder):
         try:
             os.makedirs(out_folder, exist_ok=True)
         except OSError as exc:
+            return abort(f"Error creating output folder: {exc}")
+
+    success_count = 0
+    error_count = 0
+    done = 0
+
+    load = registry.image if registry is not None else load_image
+    originals = set(duplicate_of.values())
+    original_results: dict[str, list] = {}  # Outcome of each source that has duplicates
+    parallel = workers > 1 and (total_files is None or total_files > 1)
+    track_outputs = total_files is not None or check_collisions
+    written_since = None if track_outputs else wall_started  # Untracked outputs are checked when written
+
+    def is_current(file_path: str, outputs: list) -> bool:
+        return all(
+            manifest.is_current(file_path, spec.format, output_path, spec.options(matte))
+            for spec, output_path in zip(specs, outputs)
+        )
+
+    def plan(file_path: str) -> list | None:
+        """Output paths of file_path if it still needs converting; otherwise it is reported here."""
+        nonlocal success_count, done
+        try:
+            outputs = planner.claim(file_path, specs, remember=track_outputs)
+        except OutputCollisionError as exc:
+            message = f"Skipped {os.path.basename(file_path)}: {exc}"
+            finish([FileStats(source=file_path, message=message, error_class=type(exc).__name__) for _ in specs])
+            return None
+        if manifest is not None and is_current(file_path, outputs):
+            done += 1
+            success_count += len(specs)
+            if status_cb:
+                status_cb(f"Skipped ({_progress_label(done, total_files)}): {os.path.basename(file_path)} is up to date")
+            report([FileStats(source=file_path, ok=True, skipped=True) for _ in specs])
+            return None
+        if parallel and frames is None and registry is not None and registry.has_image(file_path):
+            # Already decoded in this process: encoding here beats a worker re-decoding it
             if status_cb:
-                status_cb(f"Error creating output folder: {exc}")
-            return (0, len(files_list))
+                status_cb(f"Converting ({_progress_label(done + 1, total_files)}): {os.path.basename(file_path)}")
+            finish(_convert_outputs(file_path, specs, outputs, load, matte, written_since))
+            return None
+        return outputs
+
+    def report(results: list) -> None:
+        if results[0].source in originals:
+            original_results[results[0].source] = results
+        for stats in results:
+            if metrics is not None:
+                metrics.observe(stats)
+            if on_file is not None:
+                on_file(stats)
+            if on_event is not None:
+                on_event(FileDone(stats) if stats.ok else FileFailed(stats))
+        if on_event is not None:
+            on_event(ConversionProgress(done, total_files, success_count, error_count, results[0].source))
+
+    def finish(results: list) -> None:
+        nonlocal success_count, error_count, done
+        done += 1
+        messages = {}
+        for spec, stats in zip(specs, results):
+            if stats.ok:
+                success_count += 1
+                if manifest is not None and stats.output is not None:
+                    # The planned path, not the first split frame's, so is_current finds it next time
+                    frame_count = stats.frames if frames == "split" else 1
+                    output_path = planner.path(stats.source, spec)
+                    manifest.record(stats.source, spec.format, output_path, spec.options(matte), frame_count)
+            else:
+                error_count += 1
+                messages[stats.message] = None  # A failed decode fails every output the same way
+        if status_cb:
+            for message in messages:
+                status_cb(message)
+        report(results)
 
-    for i, file_path in enumerate(files_list):
+    def finish_duplicate(file_path: str, original: str) -> None:
         filename = os.path.basename(file_path)
-        base_name = os.path.splitext(filename)[0]
-        output_filename = f"{base_name}.{output_fmt.lower()}"
-        output_path = os.path.join(out_folder, output_filename)
         if status_cb:
-            status_cb(f"Converting ({i+1}/{total_files}): {filename}")
+            status_cb(
+                f"Duplicate ({_progress_label(done + 1, total_files)}): {filename} is identical to "
+                f"{os.path.basename(original)}"
+            )
+        results = []
+        outputs = planner.claim(file_path, specs)  # Planned upfront with the rest: can't collide
+        original_outputs = planner.claim(original, specs)
+        for original_stats, output_path, original_path in zip(original_results[original], outputs, original_outputs):
+            stats = FileStats(source=file_path, duplicate_of=original, frames=original_stats.frames)
+            results.append(stats)
+            if not original_stats.ok:
+                stats.message = f"Skipped {filename}: same content as {os.path.basename(original)}, which failed"
+                stats.error_class = original_stats.error_class
+            elif dedupe == "skip":
+                stats.ok = stats.skipped = True
+            else:
+                count = original_stats.frames if frames == "split" else 1
+                try:
+                    for index in range(count):
+                        link_output(frame_path(original_path, index, count), frame_path(output_path, index, count))
+                        stats.bytes_out += os.path.getsize(frame_path(output_path, index, count))
+                    stats.ok = True
+                    stats.output = frame_path(output_path, 0, count)
+                except OSError as exc:
+                    stats.message = f"Error linking {filename}: {type(exc).__name__}"
+                    stats.error_class = type(exc).__name__
+        finish(results)
 
-        if not os.path.exists(file_path):
-            error_count += 1
-            if status_cb:
-                status_cb(f"Skipped {filename}: not found")
-            continue
+    def finish_parallel(results: list) -> None:
+        if status_cb:
+            status_cb(f"Converting ({_progress_label(done + 1, total_files)}): {os.path.basename(results[0].source)}")
+        finish(results)
 
-        try:
-            is_heic = file_path.lower().endswith((".heic", ".heif"))
-            with Image.open(file_path) as img:
-                try:
-                    img.load()
-                except Exception:
-                    if is_heic:
-                        heif_file = pillow_heif.read_heif(file_path)
-                        img = Image.frombytes(
-                            heif_file.mode,
-                            heif_file.size,
-                            heif_file.data,
-                            "raw",
-                            heif_file.mode,
-                            heif_file.stride,
-                        )
-                current_mode = img.mode
-                if is_heic and current_mode not in ("RGB", "RGBA"):
-                    img = img.convert("RGB")
-                    current_mode = "RGB"
-
-                needs_flatten = False
-                target_mode = "RGB"
-                if output_fmt.upper() in ["JPEG", "BMP"]:
-                    if current_mode in ("RGBA", "LA", "PA"):
-                        needs_flatten = True
-                if current_mode == "P":
-                    if "transparency" in img.info:
-                        img = img.convert("RGBA")
-                        current_mode = "RGBA"
-                        if output_fmt.upper() in ["JPEG", "BMP"]:
-                            needs_flatten = True
-                    elif output_fmt.upper() in ["JPEG", "BMP"]:
-                        img = img.convert("RGB")
-                        current_mode = "RGB"
-                elif current_mode == "LA":
-                    if output_fmt.upper() in ["JPEG", "BMP"]:
-                        needs_flatten = True
-                    else:
-                        img = img.convert("RGBA")
-                        current_mode = "RGBA"
-
-                if needs_flatten:
-                    bg = Image.new(target_mode, img.size, (255, 255, 255))
-                    try:
-                        mask = img.getchannel("A")
-                        bg.paste(img, (0, 0), mask)
-                        img = bg
-                        current_mode = target_mode
-                    except Exception:
-                        img = img.convert(target_mode)
-                        current_mode = target_mode
-                elif output_fmt.upper() == "BMP" and current_mode != "RGB":
-                    img = img.convert("RGB")
-                    current_mode = "RGB"
-                elif output_fmt.upper() == "JPEG" and current_mode not in ("RGB", "L", "CMYK"):
-                    img = img.convert("RGB")
-                    current_mode = "RGB"
-
-                save_kwargs = {}
-                if output_fmt.upper() == "JPEG":
-                    save_kwargs = {"quality": 95, "optimize": True, "progressive": True}
-                elif output_fmt.upper() == "PNG":
-                    save_kwargs = {"optimize": True}
-                elif output_fmt.upper() == "WEBP":
-                    save_kwargs = {"quality": 80, "lossless": False}
-                elif output_fmt.upper() == "GIF":
-                    save_kwargs = {"optimize": True}
-                elif output_fmt.upper() == "TIFF":
-                    save_kwargs = {"compression": "tiff_lzw"}
-
-                img.save(output_path, format=output_fmt, **save_kwargs)
-                success_count += 1
-        except UnidentifiedImageError:
-            msg = (
-                f"Cannot decode HEIC: {filename}" if file_path.lower().endswith((".heic", ".heif"))
-                else f"Cannot identify image file: {filename}"
+    def pending():
+        for file_path in files:
+            outputs = plan(file_path)
+            if outputs is not None:
+                yield file_path, outputs
+
+    todo = pending()
+    cancelled = False
+
+    try:
+        if parallel:
+            cancelled = not _convert_parallel(
+                todo, specs, workers, chunk_size, max_in_flight, finish_parallel, checkpoint, memory_budget, matte,
+                frames, written_since,
             )
-            if status_cb:
-                status_cb(msg)
-            error_count += 1
-        except Exception as exc:
-            if status_cb:
-                status_cb(f"Error converting {filename}: {type(exc).__name__}")
-            error_count += 1
+        else:
+            for file_path, outputs in todo:
+                if checkpoint is not None and not checkpoint():
+                    cancelled = True
+                    break
+                if status_cb:
+                    status_cb(f"Converting ({_progress_label(done + 1, total_files)}): {os.path.basename(file_path)}")
+                if frames is not None:
+                    finish(_convert_frames(file_path, specs, outputs, frames, matte, written_since))
+                else:
+                    finish(_convert_outputs(file_path, specs, outputs, load, matte, written_since))
+        if not cancelled:
+            for file_path, original in duplicate_of.items():
+                finish_duplicate(file_path, original)
+    finally:
+        if manifest is not None:
+            manifest.commit()
 
+    emit(ConversionFinished(success_count, error_count, time.perf_counter() - started, cancelled=cancelled))
     return success_count, error_count
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import shutil
+from collections import defaultdict
+from typing import Iterable, Tuple
+
+# Bytes hashed from the start of same-sized files before any is hashed in full
+PARTIAL_HASH_BYTES = 64 * 1024
+# What convert_images does for a duplicate source: "skip" writes nothing for it,
+# "link" gives it its own outputs as hard links to the original's
+DEDUPE_MODES = ("skip", "link")
+
+
+def file_digest(path: str, limit: int | None = None) -> str:
+    """Return the BLAKE2b hex digest of a file's contents, or of its first limit bytes."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as fh:
+        if limit is not None:
+            digest.update(fh.read(limit))
+        else:
+            for block in iter(lambda: fh.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def find_duplicates(files: Iterable[str]) -> Tuple[list, dict]:
+    """Split files into distinct contents. Returns (unique, duplicate_of).
+
+    unique holds the first file of each distinct content, in input order, and
+    duplicate_of maps every other file to that first one. A path listed more
+    than once is kept once. Files are bucketed by size and only files sharing
+    a size are read: first PARTIAL_HASH_BYTES of each, then, for those still
+    matching, the whole file. Hard links to one file match without reading.
+    Files that can't be read are kept as unique, so conversion reports them.
+    """
+    files = list(dict.fromkeys(files))
+    by_size: dict[int, dict] = defaultdict(dict)  # size -> file identity -> paths
+    for path in files:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        identity = (st.st_dev, st.st_ino) if st.st_ino else path
+        by_size[st.st_size].setdefault(identity, []).append(path)
+
+    content_key = {}
+    for size, identities in by_size.items():
+        if len(identities) == 1:
+            [(identity, paths)] = identities.items()
+            content_key.update((path, (size, identity)) for path in paths)
+            continue
+        by_partial = defaultdict(list)
+        for identity, paths in identities.items():
+            try:
+                by_partial[file_digest(paths[0], PARTIAL_HASH_BYTES)].append(paths)
+            except OSError:
+                continue
+        for partial, groups in by_partial.items():
+            for paths in groups:
+                try:
+                    digest = partial if len(groups) == 1 else file_digest(paths[0])
+                except OSError:
+                    continue
+                content_key.update((path, (size, digest)) for path in paths)
+
+    unique = []
+    duplicate_of = {}
+    first = {}
+    for path in files:
+        key = content_key.get(path)
+        original = first.setdefault(key, path) if key is not None else path
+        if original == path:
+            unique.append(path)
+        else:
+            duplicate_of[path] = original
+    return unique, duplicate_of
+
+
+def link_output(original_output: str, output: str) -> None:
+    """Make output a hard link to original_output, replacing output atomically.
+
+    Falls back to a copy where hard links aren't possible (other volume,
+    FAT/exFAT, some network shares).
+    """
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    tmp_path = f"{output}.{os.getpid()}.link.tmp"
+    try:
+        try:
+            os.link(original_output, tmp_path)
+        except OSError:
+            shutil.copyfile(original_output, tmp_path)
+        os.replace(tmp_path, output)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,100 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Union
+
+from .metrics import FileStats
+
+
+@dataclass(frozen=True)
+class ConversionStarted:
+    total: int | None  # None when the input is a lazy iterable of unknown length
+
+
+@dataclass(frozen=True)
+class ConversionProgress:
+    done: int
+    total: int | None
+    succeeded: int
+    failed: int
+    current: str | None = None  # Path of the file that just finished
+
+
+@dataclass(frozen=True)
+class FileDone:
+    stats: FileStats  # stats.skipped is set for sources the manifest found up to date
+
+
+@dataclass(frozen=True)
+class FileFailed:
+    stats: FileStats
+
+
+@dataclass(frozen=True)
+class ConversionFinished:
+    succeeded: int
+    failed: int
+    seconds: float
+    error: str | None = None  # Set when the run could not start, e.g. output folder not creatable
+    cancelled: bool = False  # Stopped by a checkpoint before every file was processed
+
+
+ConversionEvent = Union[ConversionStarted, ConversionProgress, FileDone, FileFailed, ConversionFinished]
+
+
+class ProgressThrottle:
+    """Event sink wrapper that coalesces progress to at most rate deliveries per second.
+
+    Started, failure and finished events are always forwarded; progress events
+    arriving faster than the rate only replace the pending one, and the latest is
+    flushed before ConversionFinished. FileDone events are dropped unless
+    forward_files is set, since they arrive at full file throughput.
+
+    A pending event is otherwise only delivered with the next event, so after
+    a burst of fast files the count would lag for as long as the next file
+    takes. Call flush() periodically, e.g. from a UI's poll loop: it may be
+    called from any thread, and the sink is never called concurrently.
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[ConversionEvent], None],
+        rate: float = 10.0,
+        forward_files: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.sink = sink
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.forward_files = forward_files
+        self._clock = clock
+        self._last = float("-inf")
+        self._pending: ConversionProgress | None = None
+        self._lock = threading.Lock()
+
+    def __call__(self, event: ConversionEvent) -> None:
+        with self._lock:
+            if isinstance(event, ConversionProgress):
+                now = self._clock()
+                if now - self._last >= self.interval:
+                    self._last = now
+                    self._pending = None
+                    self.sink(event)
+                else:
+                    self._pending = event
+                return
+            if isinstance(event, FileDone) and not self.forward_files:
+                return
+            if isinstance(event, ConversionFinished):
+                self._flush()
+            self.sink(event)
+
+    def flush(self) -> None:
+        """Deliver the pending progress event, if any."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending is not None:
+            event, self._pending = self._pending, None
+            self._last = self._clock()
+            self.sink(event)
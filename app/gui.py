@@ -6,17 +6,30 @@ from tkinter import ttk  # Themed widgets
 from tkinter import filedialog, messagebox
 # Make sure you are using tkinterdnd2 here after the previous fix!
 from tkinterdnd2 import TkinterDnD, DND_FILES # Import TkinterDnD and the file type
-from PIL import Image, UnidentifiedImageError # Pillow for image processing
+from PIL import UnidentifiedImageError # Pillow for image processing
 import os
+import queue
 import threading # To keep UI responsive during conversion
 import sys # Needed for theme check
-import pillow_heif # <--- Import pillow-heif to register HEIC support
 
-# Register HEIC/HEIF formats explicitly
-pillow_heif.register_heif_opener()
+# HEIC/HEIF support (pillow_heif) is registered on first decode, see app.heif
+from .conversion import FIT_MODES, SUPPORTED_OUTPUT_FORMATS, OutputSpec
+from .events import ConversionFinished, ConversionProgress, FileFailed, ProgressThrottle
+from .probe import validate_image_file
+from .registry import ImageRegistry
+from .thumbcache import ThumbnailCache
+from .thumbnails import ThumbnailGrid, ThumbnailLoader
 
-from .conversion import SUPPORTED_OUTPUT_FORMATS, convert_images, get_compatible_formats
-from .thumbnails import update_thumbnails
+# Conversion events are drained into the status bar at this interval (10 Hz)
+EVENT_POLL_MS = 100
+
+
+def _common_folder(files):
+    """Deepest folder holding every file, or None if they are on different drives."""
+    try:
+        return os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in files])
+    except ValueError:
+        return None
 
 class ImageConverterApp(TkinterDnD.Tk): # Inherit from TkinterDnD.Tk for DND
 
@@ -36,14 +49,31 @@ class ImageConverterApp(TkinterDnD.Tk): # Inherit from TkinterDnD.Tk for DND
         
         # --- Data Storage ---
         self.input_files = []
+        self._input_index = set()  # os.path.normcase of every entry in input_files, for O(1) duplicate checks
         self.output_folder = tk.StringVar(value=os.path.expanduser("~")) # Default to home dir
         self.output_format = tk.StringVar(value=SUPPORTED_OUTPUT_FORMATS[0])
-        self.thumbnail_widgets = [] # Keep track of thumbnail labels (PhotoImage objects)
+        self.max_size = tk.StringVar(value="") # Longest edge in pixels; empty keeps the original size
+        self.fit_mode = tk.StringVar(value=FIT_MODES[0])
+        self.keep_structure = tk.BooleanVar(value=False) # Mirror the source folders below the output folder
+        # Decoded images, info and thumbnails shared by preview, dropdown and conversion,
+        # backed by a disk thumbnail cache so unchanged files aren't re-decoded
+        self.image_registry = ImageRegistry(thumbnail_cache=ThumbnailCache())
+        self.thumbnail_loader = ThumbnailLoader(self, self.image_registry) # Decodes off the UI thread
+        self.conversion_job = None # The running ConversionJob, if any
 
         # --- UI Elements ---
         self._create_widgets()
+        self.thumbnail_grid = ThumbnailGrid(self.canvas, self.scrollable_frame, self.scrollbar, self.thumbnail_loader)
+        self.thumbnail_grid.set_files(self.input_files)
         self._configure_drag_and_drop()
         self._update_output_format_dropdown() # Initial call after widgets are created
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _on_close(self):
+        if self.conversion_job is not None:
+            self.conversion_job.cancel() # Files already started finish; outputs are never left half-written
+        self.thumbnail_loader.shutdown() # Drop queued thumbnail work so exit isn't delayed
+        self.destroy()
 
     def _create_widgets(self):
         # Main frame
@@ -88,7 +118,7 @@ class ImageConverterApp(TkinterDnD.Tk): # Inherit from TkinterDnD.Tk for DND
         )
 
         self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set) # Replaced by ThumbnailGrid to track the visible rows
 
         self.canvas.pack(side="left", fill="both", expand=True)
         self.scrollbar.pack(side="right", fill="y")
@@ -112,6 +142,13 @@ class ImageConverterApp(TkinterDnD.Tk): # Inherit from TkinterDnD.Tk for DND
         browse_button = ttk.Button(folder_frame, text="Browse...", command=self._browse_output_folder)
         browse_button.pack(side=tk.LEFT)
 
+        # Files with the same name from different folders need their folders kept apart
+        ttk.Checkbutton(
+            output_settings_frame,
+            text="Keep folder structure",
+            variable=self.keep_structure
+        ).pack(anchor=tk.W, pady=(0, 5))
+
         # Output Format
         format_frame = ttk.Frame(output_settings_frame)
         format_frame.pack(fill=tk.X)
@@ -126,6 +163,17 @@ class ImageConverterApp(TkinterDnD.Tk): # Inherit from TkinterDnD.Tk for DND
         self.format_combo = format_combo # Store as instance variable
         self.format_combo.pack(side=tk.LEFT)
 
+        # Optional downscale, applied before encoding
+        ttk.Label(format_frame, text="Max size (px):").pack(side=tk.LEFT, padx=(15, 5))
+        ttk.Entry(format_frame, textvariable=self.max_size, width=6).pack(side=tk.LEFT)
+        ttk.Combobox(
+            format_frame,
+            textvariable=self.fit_mode,
+            values=FIT_MODES,
+            state='readonly',
+            width=5
+        ).pack(side=tk.LEFT, padx=(5, 0))
+
         # 4. Convert Button & Status
         action_frame = ttk.Frame(main_frame, padding="5")
         action_frame.pack(fill=tk.X)
@@ -136,6 +184,9 @@ class ImageConverterApp(TkinterDnD.Tk): # Inherit from TkinterDnD.Tk for DND
         self.convert_button = ttk.Button(action_frame, text="Convert", command=self._start_conversion_thread, state=tk.DISABLED)
         self.convert_button.pack(side=tk.RIGHT)
 
+        self.cancel_button = ttk.Button(action_frame, text="Cancel", command=self._cancel_conversion, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT, padx=(0, 5))
+
     def _configure_drag_and_drop(self):
         # Register the DND label to accept file drops
         self.dnd_label.drop_target_register(DND_FILES)
@@ -150,40 +201,53 @@ class ImageConverterApp(TkinterDnD.Tk): # Inherit from TkinterDnD.Tk for DND
              messagebox.showerror("Drop Error", "Could not parse the dropped file paths.")
              return
 
-        new_files = []
+        self.status_label.config(text=f"Checking {len(files_str)} dropped item(s)...")
+        # Validate off the UI thread so large drops don't freeze the window
+        threading.Thread(target=self._validate_drop, args=(files_str,), daemon=True).start()
+
+    def _validate_drop(self, files_str):
+        """Runs on a worker thread. Only signatures/headers are checked here;
+        full decoding is verified at conversion time."""
+        valid_files = []
         skipped_non_image = 0
         skipped_other = 0
-        skipped_duplicates = 0
 
         for f in files_str:
             # Normalize path (optional, but can help consistency)
             f_norm = os.path.normpath(f)
             if os.path.isfile(f_norm): # Check if it's actually a file
                 try:
-                    # Attempt to open the image to check if it's a valid image format
-                    with Image.open(f_norm) as img:
-                        img.load() # Actually load image data to catch more errors
-
-                    # If successful, and not a duplicate, add to new_files
-                    if f_norm not in self.input_files:
-                        new_files.append(f_norm)
-                    else:
-                        skipped_duplicates += 1
-                        print(f"Skipping duplicate file: {os.path.basename(f_norm)}")
-
+                    validate_image_file(f_norm) # Magic bytes, or header parse for unknown signatures
+                    valid_files.append(f_norm)
                 except UnidentifiedImageError:
                     skipped_non_image += 1
                     print(f"Skipping unsupported image file: {os.path.basename(f_norm)}")
                 except FileNotFoundError: # Should ideally be caught by os.path.isfile, but good to have
                     skipped_other += 1
                     print(f"Skipping (file not found during open): {f_norm}")
-                except Exception as e: # Catch other potential PIL errors
+                except Exception as e: # Catch other potential read errors
                     skipped_other += 1
                     print(f"Skipping file due to other error during open ({type(e).__name__}): {os.path.basename(f_norm)}")
             else:
                 skipped_other += 1 # This handles directories or other non-file items
                 print(f"Skipping item (not a file or not found): {f_norm}")
 
+        self.after(0, lambda: self._finish_drop(valid_files, skipped_non_image, skipped_other))
+
+    def _finish_drop(self, valid_files, skipped_non_image, skipped_other):
+        """Back on the UI thread: merge validated files into the list and refresh."""
+        new_files = []
+        skipped_duplicates = 0
+        for f_norm in valid_files:
+            # If not a duplicate, add to new_files
+            key = os.path.normcase(f_norm)
+            if key not in self._input_index:
+                self._input_index.add(key)
+                new_files.append(f_norm)
+            else:
+                skipped_duplicates += 1
+                print(f"Skipping duplicate file: {os.path.basename(f_norm)}")
+
         if new_files:
             self.input_files.extend(new_files)
             status_msg = f"Added {len(new_files)} image(s)." # Changed "file(s)" to "image(s)"
@@ -223,6 +287,8 @@ class ImageConverterApp(TkinterDnD.Tk): # Inherit from TkinterDnD.Tk for DND
         confirmed = messagebox.askyesno("Clear List", f"Are you sure you want to clear the list of {len(self.input_files)} image(s)?")
         if confirmed:
             self.input_files = []
+            self._input_index.clear()
+            self.image_registry.clear() # Release decoded images
             self._update_thumbnails() # This clears the display
             self._update_output_format_dropdown() # Update dropdown as file list is now empty
             self.status_label.config(text="List cleared. Drop new images.")
@@ -238,9 +304,7 @@ class ImageConverterApp(TkinterDnD.Tk): # Inherit from TkinterDnD.Tk for DND
             file_path = self.input_files[0]
             compatible_formats = []
             try:
-                with Image.open(file_path) as img:
-                    img.load()  # Ensure image data is loaded
-                    compatible_formats = get_compatible_formats(img)
+                compatible_formats = self.image_registry.info(file_path).compatible_formats # No extra decode
             except Exception as e:
                 print(f"Error opening image {file_path} for format compatibility check: {e}")
                 # Fallback to all supported formats if image can't be opened/read for mode
@@ -266,9 +330,7 @@ class ImageConverterApp(TkinterDnD.Tk): # Inherit from TkinterDnD.Tk for DND
 
 
     def _update_thumbnails(self):
-        self.thumbnail_widgets = update_thumbnails(
-            self.scrollable_frame, self.canvas, self.input_files
-        )
+        self.thumbnail_grid.set_files(self.input_files)
 
 
     def _browse_output_folder(self):
@@ -283,7 +345,7 @@ class ImageConverterApp(TkinterDnD.Tk): # Inherit from TkinterDnD.Tk for DND
     def _update_convert_button_state(self):
         """Enable convert button only if files are loaded and output folder is valid."""
         state = tk.DISABLED # Default to disabled
-        if self.input_files:
+        if self.input_files and self.conversion_job is None:
             out_folder = self.output_folder.get()
             if out_folder and os.path.isdir(out_folder): # Check it exists and is a directory
                  state = tk.NORMAL
@@ -340,26 +402,81 @@ class ImageConverterApp(TkinterDnD.Tk): # Inherit from TkinterDnD.Tk for DND
              # Try browsing again automatically
              # self._browse_output_folder()
              return
+        max_size = self.max_size.get().strip()
+        if max_size and (not max_size.isdigit() or int(max_size) == 0):
+            messagebox.showwarning("Invalid Max Size", "Max size must be a whole number of pixels, or empty.")
+            return
+        spec = OutputSpec(self.output_format.get(), max_size=int(max_size) if max_size else None, fit=self.fit_mode.get())
 
         self.convert_button.config(state=tk.DISABLED) # Disable button during conversion
+        self.cancel_button.config(state=tk.NORMAL)
         self.status_label.config(text="Starting conversion...")
 
+        # Progress comes back through this queue, drained on the main thread
+        events = queue.SimpleQueue()
+        throttle = ProgressThrottle(events.put, rate=1000 / EVENT_POLL_MS)
+        self.after(EVENT_POLL_MS, self._poll_conversion_events, events, throttle)
+
+        from .jobs import ConversionJob  # Not needed until the first conversion
+
         # Make a copy of the list for the thread to work on
-        files_to_convert = list(self.input_files)
+        self.conversion_job = ConversionJob(
+            list(self.input_files), spec, out_folder,
+            workers=os.cpu_count() or 1,
+            registry=self.image_registry,
+            source_root=_common_folder(self.input_files) if self.keep_structure.get() else None,
+            dedupe="link",  # The same photo saved under several names is converted once
+            on_event=throttle,
+        )
 
         # Create and start the thread
         conversion_thread = threading.Thread(
             target=self._run_conversion,
-            args=(files_to_convert,),  # Pass the copy of the list
+            args=(self.conversion_job, events),
             daemon=True)
         conversion_thread.start()
 
-    def _run_conversion(self, files):
-        def cb(msg):
-            self.after(0, lambda m=msg: self.status_label.config(text=m))
-        success, error = convert_images(files, self.output_format.get(), self.output_folder.get(), cb)
-        final_status = f"Conversion finished: {success} succeeded, {error} failed."
-        self.after(0, lambda: self.status_label.config(text=final_status))
-        self.after(0, self._update_convert_button_state)
+    def _cancel_conversion(self):
+        if self.conversion_job is not None:
+            self.conversion_job.cancel()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.status_label.config(text="Cancelling after the current file(s)...")
+
+    def _run_conversion(self, job, events):
+        """Worker thread: events are queued here and applied by _poll_conversion_events."""
+        try:
+            job.run()
+        except Exception as exc:
+            events.put(ConversionFinished(0, len(job.files), 0.0, error=f"Conversion failed: {type(exc).__name__}"))
+
+    def _poll_conversion_events(self, events, throttle):
+        """Main thread: apply queued conversion events to the status bar."""
+        throttle.flush() # Progress held back by the throttle shows up now, not with the next file
+        while True:
+            try:
+                event = events.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(event, FileFailed):
+                self.status_label.config(text=event.stats.message)
+            elif isinstance(event, ConversionProgress):
+                progress = f"{event.done}/{event.total}" if event.total is not None else f"{event.done} done"
+                status = f"Converting ({progress}): {os.path.basename(event.current)}"
+                if event.failed:
+                    status += f" - {event.failed} failed"
+                self.status_label.config(text=status)
+            elif isinstance(event, ConversionFinished):
+                outcome = "cancelled" if event.cancelled else "finished"
+                error = event.error
+                if error and error.startswith("Output name collision") and not self.keep_structure.get():
+                    error += " - tick 'Keep folder structure' to keep equally named files apart."
+                self.status_label.config(
+                    text=error or f"Conversion {outcome}: {event.succeeded} succeeded, {event.failed} failed."
+                )
+                self.conversion_job = None
+                self.cancel_button.config(state=tk.DISABLED)
+                self._update_convert_button_state()
+                return
+        self.after(EVENT_POLL_MS, self._poll_conversion_events, events, throttle)
 
 
@@ -0,0 +1,27 @@
+"""HEIF/HEIC support through pillow_heif, loaded on first use.
+
+Importing pillow_heif and registering its Pillow plugin is the largest single
+cost of importing the app, so nothing does it at import time: code that opens
+images calls register_heif() first.
+"""
+import threading
+from types import ModuleType
+
+_lock = threading.Lock()
+_pillow_heif: ModuleType | None = None
+
+
+def register_heif() -> ModuleType:
+    """Import pillow_heif and register its Pillow opener, once per process. Returns the module.
+
+    Thread-safe; after the first call this is a global lookup. Process pool
+    workers register on their own first decode.
+    """
+    global _pillow_heif
+    if _pillow_heif is None:
+        with _lock:
+            if _pillow_heif is None:
+                import pillow_heif
+                pillow_heif.register_heif_opener()
+                _pillow_heif = pillow_heif
+    return _pillow_heif
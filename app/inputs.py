@@ -0,0 +1,67 @@
+import glob
+import os
+import sys
+from typing import Callable, Iterable, Iterator
+
+# File extensions picked up when walking directories
+INPUT_EXTENSIONS = {
+    ".heic", ".heif", ".hif", ".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tif", ".tiff", ".webp",
+}
+
+
+def walk_image_files(
+    top: str,
+    recursive: bool = True,
+    on_error: Callable[[str], None] | None = None,
+) -> Iterator[str]:
+    """Lazily yield image files below top using os.scandir.
+
+    Only one directory handle is open at a time and nothing is collected
+    upfront, so memory stays flat regardless of how many files the tree holds.
+    Directories that can't be read are skipped and reported to on_error
+    (stderr by default).
+    """
+    pending_dirs = [top]
+    while pending_dirs:
+        directory = pending_dirs.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                pending_dirs.append(entry.path)
+                        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in INPUT_EXTENSIONS:
+                            yield entry.path
+                    except OSError:
+                        continue
+        except OSError as exc:
+            message = f"Skipping unreadable directory {directory}: {exc}"
+            if on_error is not None:
+                on_error(message)
+            else:
+                print(message, file=sys.stderr)
+
+
+def iter_image_files(
+    inputs: Iterable[str],
+    recursive: bool = True,
+    on_error: Callable[[str], None] | None = None,
+) -> Iterator[str]:
+    """Expand files, directories and glob patterns into a lazy stream of paths.
+
+    Explicit file arguments are passed through unchanged (missing ones are
+    reported by convert_images); directories are walked for image files, see
+    walk_image_files for on_error.
+    """
+    for item in inputs:
+        if os.path.isdir(item):
+            yield from walk_image_files(item, recursive, on_error)
+        elif any(ch in item for ch in "*?["):
+            for match in glob.iglob(item, recursive=True):
+                if os.path.isdir(match):
+                    yield from walk_image_files(match, recursive, on_error)
+                elif os.path.isfile(match):
+                    yield match
+        else:
+            yield item
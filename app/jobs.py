@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+from collections.abc import Sized
+from typing import Iterable, Tuple
+
+from .conversion import DEFAULT_MATTE, OutputSpec, as_specs, convert_images
+from .metrics import FileStats
+from .planner import DEFAULT_TEMPLATE
+
+STATE_VERSION = 1
+# Completed sources are flushed to the state file after this many files
+SAVE_STATE_EVERY = 50
+
+
+class ConversionJob:
+    """A convert_images run that can be paused, resumed and cancelled from another thread.
+
+    Checks are cooperative: a file (or, in parallel mode, a chunk) that has
+    started always finishes, and nothing after it is started once the job is
+    cancelled. Outputs are renamed into place only when fully written.
+
+    With state_path, the sources finished so far are recorded in a JSON state
+    file. A new job over the same state file, output format and folder skips
+    them, so a cancelled or crashed run can be resumed. The file is removed
+    once a run completes; an unreadable one is ignored and reported to
+    status_cb. Keyword arguments are passed on to convert_images.
+    """
+
+    def __init__(
+        self,
+        files: Iterable[str],
+        output_fmt: str | OutputSpec | Iterable[str | OutputSpec],
+        out_folder: str,
+        state_path: str | None = None,
+        **convert_kwargs,
+    ):
+        self.files = files
+        self.output_fmt = output_fmt
+        self.out_folder = out_folder
+        self.state_path = state_path
+        self._on_file = convert_kwargs.pop("on_file", None)
+        self.convert_kwargs = convert_kwargs
+        self.completed: set[str] = set()
+        self._outputs = len(as_specs(output_fmt))
+        self._partial: dict[str, int] = {}  # Sources with only some outputs written so far
+        self._unsaved = 0
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+        self._stopped = False
+        if state_path is not None:
+            self.completed = self._load_state()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        self._running.set()  # Wake a paused job so it can stop
+
+    def pause(self) -> None:
+        if not self.cancelled:
+            self._running.clear()
+
+    def resume(self) -> None:
+        self._running.set()
+
+    def _checkpoint(self) -> bool:
+        self._running.wait()
+        self._stopped = self.cancelled
+        return not self._stopped
+
+    def _state_key(self) -> dict:
+        matte = self.convert_kwargs.get("matte", DEFAULT_MATTE)
+        key = {
+            "version": STATE_VERSION,
+            "out_folder": os.path.abspath(self.out_folder),
+            "outputs": [[spec.format.upper(), spec.options(matte)] for spec in as_specs(self.output_fmt)],
+        }
+        # Only when set, so state files written before naming was configurable still match
+        if self.convert_kwargs.get("template", DEFAULT_TEMPLATE) != DEFAULT_TEMPLATE:
+            key["template"] = self.convert_kwargs["template"]
+        if self.convert_kwargs.get("source_root") is not None:
+            key["source_root"] = os.path.abspath(self.convert_kwargs["source_root"])
+        if self.convert_kwargs.get("dedupe") is not None:
+            key["dedupe"] = self.convert_kwargs["dedupe"]
+        if self.convert_kwargs.get("frames") is not None:
+            key["frames"] = self.convert_kwargs["frames"]
+        return key
+
+    def _load_state(self) -> set:
+        try:
+            with open(self.state_path, encoding="utf-8") as fh:
+                state = json.load(fh)
+        except FileNotFoundError:
+            return set()
+        except (OSError, ValueError) as exc:
+            status_cb = self.convert_kwargs.get("status_cb")
+            if status_cb:
+                status_cb(f"Ignoring unreadable job state {self.state_path}: {exc}")
+            return set()
+        if {k: state.get(k) for k in self._state_key()} != self._state_key():
+            return set()  # Different run: start over
+        return set(state.get("completed", []))
+
+    def save_state(self) -> None:
+        if self.state_path is None:
+            return
+        state = dict(self._state_key(), completed=sorted(self.completed))
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(state, fh)
+        os.replace(tmp_path, self.state_path)
+        self._unsaved = 0
+
+    def _record(self, stats: FileStats) -> None:
+        if stats.ok and self.state_path is not None:
+            self._count_output(os.path.abspath(stats.source))
+        if self._on_file is not None:
+            self._on_file(stats)
+
+    def _count_output(self, source: str) -> None:
+        """A source is completed once every one of its outputs has been written."""
+        written = self._partial.pop(source, 0) + 1
+        if written < self._outputs:
+            self._partial[source] = written
+            return
+        self.completed.add(source)
+        self._unsaved += 1
+        if self._unsaved >= SAVE_STATE_EVERY:
+            self.save_state()
+
+    def run(self) -> Tuple[int, int]:
+        """Run (or resume) the job on this thread. Returns (success_count, error_count) for this run."""
+        files = self.files
+        if self.completed:
+            pending = (f for f in files if os.path.abspath(f) not in self.completed)
+            files = list(pending) if isinstance(files, Sized) else pending  # Keep the total known
+        try:
+            result = convert_images(
+                files, self.output_fmt, self.out_folder,
+                on_file=self._record,
+                checkpoint=self._checkpoint,
+                **self.convert_kwargs,
+            )
+        finally:
+            self.save_state()
+        if not self._stopped and self.state_path is not None:
+            try:
+                os.remove(self.state_path)
+            except OSError:
+                pass
+        return result
@@ -0,0 +1,133 @@
+import json
+import os
+import sqlite3
+
+from .dedup import file_digest
+from .planner import frame_path
+
+# Number of recorded conversions buffered before committing to disk
+COMMIT_EVERY = 100
+
+
+class Manifest:
+    """On-disk record of completed conversions, used to skip unchanged sources.
+
+    Entries are keyed on the absolute source path, the output format and the
+    encoder options, and store the source size and mtime (plus a content hash
+    when use_hash is set). A source is up to date when its output still exists
+    (the first numbered file, if its frames were split) and its size and mtime
+    match; with use_hash a changed mtime is tolerated as long as the contents
+    hash to the recorded value, and the new mtime is recorded so the file
+    isn't hashed again next time.
+    """
+
+    def __init__(self, path: str, use_hash: bool = False):
+        self.path = path
+        self.use_hash = use_hash
+        self._uncommitted = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS conversions (
+                source TEXT NOT NULL,
+                output_fmt TEXT NOT NULL,
+                options TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT,
+                output_path TEXT NOT NULL,
+                frames INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (source, output_fmt, options)
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(conversions)")}
+        if "frames" not in columns:  # Manifest written before frames were recorded
+            self._conn.execute("ALTER TABLE conversions ADD COLUMN frames INTEGER NOT NULL DEFAULT 1")
+        self._conn.commit()
+
+    @staticmethod
+    def _options_key(options: dict | None) -> str:
+        return json.dumps(options or {}, sort_keys=True)
+
+    def is_current(self, source: str, output_fmt: str, output_path: str, options: dict | None = None) -> bool:
+        """Return True if source was already converted with these settings and is unchanged."""
+        try:
+            st = os.stat(source)
+        except OSError:
+            return False
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, content_hash, output_path, frames FROM conversions"
+            " WHERE source = ? AND output_fmt = ? AND options = ?",
+            (os.path.abspath(source), output_fmt.upper(), self._options_key(options)),
+        ).fetchone()
+        if row is None:
+            return False
+        size, mtime_ns, content_hash, recorded_output, frames = row
+        if recorded_output != os.path.abspath(output_path) or not os.path.exists(frame_path(output_path, 0, frames)):
+            return False
+        if size != st.st_size:
+            return False
+        if mtime_ns == st.st_mtime_ns:
+            return True
+        if self.use_hash and content_hash:
+            try:
+                if file_digest(source) != content_hash:
+                    return False
+            except OSError:
+                return False
+            # Touched but unchanged: store the new mtime so later runs don't hash it again.
+            # Every output of the source recorded with this content is refreshed at once.
+            self._conn.execute(
+                "UPDATE conversions SET mtime_ns = ? WHERE source = ? AND size = ? AND content_hash = ?",
+                (st.st_mtime_ns, os.path.abspath(source), st.st_size, content_hash),
+            )
+            self._uncommitted += 1
+            if self._uncommitted >= COMMIT_EVERY:
+                self.commit()
+            return True
+        return False
+
+    def record(
+        self, source: str, output_fmt: str, output_path: str, options: dict | None = None, frames: int = 1
+    ) -> None:
+        """Store the current fingerprint of source after a successful conversion.
+
+        frames is the number of numbered files output_path was split into (see
+        planner.frame_path), 1 if it was written as is.
+        """
+        try:
+            st = os.stat(source)
+            content_hash = file_digest(source) if self.use_hash else None
+        except OSError:
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO conversions"
+            " (source, output_fmt, options, size, mtime_ns, content_hash, output_path, frames)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                os.path.abspath(source),
+                output_fmt.upper(),
+                self._options_key(options),
+                st.st_size,
+                st.st_mtime_ns,
+                content_hash,
+                os.path.abspath(output_path),
+                frames,
+            ),
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self) -> None:
+        self._conn.commit()
+        self._uncommitted = 0
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,193 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import IO
+
+# Pipeline stages timed for every file, in pipeline order
+STAGES = ("open", "load", "heif_decode", "heif_fallback", "resize", "convert", "flatten", "save")
+
+# Histogram bucket upper bounds in seconds (Prometheus style, +Inf implied)
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class StageTimer:
+    """Accumulates wall time per named stage."""
+
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+
+@dataclass
+class FileStats:
+    """Outcome of converting one source file. Picklable, so workers can return it."""
+
+    source: str
+    output: str | None = None
+    ok: bool = False
+    skipped: bool = False
+    duplicate_of: str | None = None  # Source with identical content this one was deduplicated against
+    message: str | None = None  # Status message describing a failure
+    error_class: str | None = None
+    bytes_in: int = 0
+    bytes_out: int = 0
+    frames: int = 1  # Frames written: pages of the output, or its numbered files when frames are split
+    seconds: float = 0.0
+    stages: dict = field(default_factory=dict)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), sort_keys=True)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = SECONDS_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def cumulative(self) -> list:
+        """(upper bound, cumulative count) pairs, ending with +Inf."""
+        pairs = []
+        running = 0
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {("+Inf" if b == float("inf") else str(b)): c for b, c in self.cumulative()},
+        }
+
+
+class ConversionMetrics:
+    """Aggregated counters and stage-time histograms over many FileStats."""
+
+    def __init__(self):
+        self.files = {"ok": 0, "failed": 0, "skipped": 0}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.errors: dict[str, int] = {}
+        self.file_seconds = Histogram()
+        self.stage_seconds = {stage: Histogram() for stage in STAGES}
+
+    def observe(self, stats: FileStats) -> None:
+        if stats.skipped:
+            self.files["skipped"] += 1
+            return
+        self.files["ok" if stats.ok else "failed"] += 1
+        if stats.error_class:
+            self.errors[stats.error_class] = self.errors.get(stats.error_class, 0) + 1
+        self.bytes_in += stats.bytes_in
+        self.bytes_out += stats.bytes_out
+        self.file_seconds.observe(stats.seconds)
+        for stage, seconds in stats.stages.items():
+            self.stage_seconds.setdefault(stage, Histogram()).observe(seconds)
+
+    def to_dict(self) -> dict:
+        return {
+            "files": dict(self.files),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "errors": dict(self.errors),
+            "file_seconds": self.file_seconds.to_dict(),
+            "stage_seconds": {stage: h.to_dict() for stage, h in self.stage_seconds.items() if h.count},
+        }
+
+    def to_prometheus(self, prefix: str = "image_converter") -> str:
+        """Render in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_files_total Files processed, by outcome.",
+            f"# TYPE {prefix}_files_total counter",
+        ]
+        lines += [f'{prefix}_files_total{{outcome="{k}"}} {v}' for k, v in self.files.items()]
+        lines += [
+            f"# HELP {prefix}_errors_total Failed files, by error class.",
+            f"# TYPE {prefix}_errors_total counter",
+        ]
+        lines += [f'{prefix}_errors_total{{error_class="{k}"}} {v}' for k, v in sorted(self.errors.items())]
+        for name, value in (("bytes_in", self.bytes_in), ("bytes_out", self.bytes_out)):
+            lines += [
+                f"# HELP {prefix}_{name}_total Source/output bytes of converted files.",
+                f"# TYPE {prefix}_{name}_total counter",
+                f"{prefix}_{name}_total {value}",
+            ]
+
+        def histogram(metric: str, hist: Histogram, labels: str = "") -> list:
+            sep = "," if labels else ""
+            out = [
+                f'{metric}_bucket{{{labels}{sep}le="{"+Inf" if b == float("inf") else b}"}} {c}'
+                for b, c in hist.cumulative()
+            ]
+            suffix = f"{{{labels}}}" if labels else ""
+            out += [f"{metric}_sum{suffix} {hist.sum}", f"{metric}_count{suffix} {hist.count}"]
+            return out
+
+        lines += [
+            f"# HELP {prefix}_file_seconds Wall time per converted file.",
+            f"# TYPE {prefix}_file_seconds histogram",
+        ]
+        lines += histogram(f"{prefix}_file_seconds", self.file_seconds)
+        lines += [
+            f"# HELP {prefix}_stage_seconds Wall time per pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for stage, hist in self.stage_seconds.items():
+            if hist.count:
+                lines += histogram(f"{prefix}_stage_seconds", hist, f'stage="{stage}"')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Write a node_exporter textfile-collector file atomically."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            fh.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+class JsonLinesExporter:
+    """Callable sink writing one JSON object per FileStats to a file or stream."""
+
+    def __init__(self, target: str | IO[str]):
+        if isinstance(target, str):
+            self._stream = open(target, "a", encoding="utf-8")
+            self._owned = True
+        else:
+            self._stream = target
+            self._owned = False
+
+    def __call__(self, stats: FileStats) -> None:
+        self._stream.write(stats.to_json() + "\n")
+
+    def close(self) -> None:
+        if self._owned:
+            self._stream.close()
+        else:
+            self._stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,181 @@
+import os
+from string import Formatter
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from .conversion import OutputSpec
+
+# Output file name, relative to the output folder (plus the source's subfolder when mirroring)
+DEFAULT_TEMPLATE = "{stem}{suffix}.{ext}"
+# Fields a naming template may use
+TEMPLATE_FIELDS = {
+    "stem",  # Source file name without its extension
+    "source_ext",  # Source extension, lower case, without the dot
+    "parent",  # Name of the folder holding the source
+    "suffix",  # OutputSpec.suffix
+    "ext",  # Output format, lower case
+    "format",  # Output format, upper case
+}
+
+
+class OutputCollisionError(ValueError):
+    """Different sources would be written to the same output path."""
+
+    def __init__(self, collisions: dict):
+        # Output path -> the sources planned onto it; empty when the clash is
+        # only found at write time (see conversion._atomic_file)
+        self.collisions = collisions
+        output, sources = next(iter(collisions.items()))
+        more = f" (and {len(collisions) - 1} more)" if len(collisions) > 1 else ""
+        if not sources:
+            super().__init__(f"{output} was already written by another source in this run{more}")
+            return
+        culprits = f"Two outputs of {sources[0]}" if sources[0] == sources[1] else f"{sources[0]} and {sources[1]}"
+        super().__init__(f"{culprits} would both be written to {output}{more}")
+
+
+class OutputPlanner:
+    """Maps each source to its output paths and refuses to map two sources onto one.
+
+    Output names come from template (see TEMPLATE_FIELDS), which may contain
+    subfolders, e.g. "{format}/{stem}{suffix}.{ext}". With source_root, each
+    output is also placed in the source's folder relative to source_root, so
+    a/IMG_0001.HEIC and b/IMG_0001.HEIC end up in out/a and out/b; sources
+    outside source_root go to the top of the output folder.
+
+    With split_frames, each claimed output also reserves the numbered names
+    its frames are written to (photo_1.png, photo_02.png, ...; see
+    frame_path). A source whose output has such a name
+    (photo_2.png next to photo.heic) then collides with it, even if
+    photo.heic turns out to hold a single image: frame counts aren't known
+    until the source is decoded.
+
+    Paths are compared with os.path.normcase, so outputs differing only in
+    case collide on Windows. Every claimed path is remembered for the
+    planner's lifetime, so its memory grows with the number of sources
+    (roughly the path lengths plus 200 bytes per output).
+    """
+
+    def __init__(
+        self,
+        out_folder: str,
+        template: str = DEFAULT_TEMPLATE,
+        source_root: str | None = None,
+        split_frames: bool = False,
+    ):
+        fields = {name for _, name, _, _ in Formatter().parse(template) if name is not None}
+        unknown = fields - TEMPLATE_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown naming template field(s): {', '.join(sorted(unknown))}")
+        parts = os.path.normpath(template).split(os.sep)
+        if os.path.isabs(template) or os.pardir in parts:
+            raise ValueError(f"Naming template must stay inside the output folder: {template!r}")
+        self.out_folder = out_folder
+        self.template = template
+        self.source_root = os.path.abspath(source_root) if source_root is not None else None
+        self.split_frames = split_frames
+        self._claimed: dict[str, str] = {}  # normcase(abspath(output)) -> abspath(source)
+        # With split_frames: key of a claimed numbered output without its number -> {source: output}
+        self._numbered: dict[str, dict] = {}
+
+    def path(self, file_path: str, spec: "OutputSpec") -> str:
+        """Output path of file_path for spec. Does not check for collisions."""
+        stem, source_ext = os.path.splitext(os.path.basename(file_path))
+        source_dir = os.path.dirname(os.path.abspath(file_path))
+        name = self.template.format(
+            stem=stem,
+            source_ext=source_ext[1:].lower(),
+            parent=os.path.basename(source_dir),
+            suffix=spec.suffix,
+            ext=spec.format.lower(),
+            format=spec.format.upper(),
+        )
+        if self.source_root is not None:
+            relative = os.path.relpath(source_dir, self.source_root)
+            if relative != os.pardir and not relative.startswith(os.pardir + os.sep):
+                name = os.path.join(relative, name)
+        return os.path.normpath(os.path.join(self.out_folder, name))
+
+    def claim(self, file_path: str, specs: list, remember: bool = True) -> list:
+        """Output paths of file_path, one per spec, reserved for it.
+
+        Raises OutputCollisionError if another source (or another spec of this
+        one) already holds one of them; nothing is reserved in that case.
+        Claiming the same source again returns the same paths. With
+        remember=False the paths are checked but not reserved.
+        """
+        source = os.path.abspath(file_path)
+        outputs = [self.path(file_path, spec) for spec in specs]
+        keys = [os.path.normcase(os.path.abspath(output)) for output in outputs]
+        collisions = {}
+        for output, key in zip(outputs, keys):
+            conflict = self._conflict(output, key, source)
+            if conflict is not None:
+                collisions[conflict[0]] = [conflict[1], source]
+        if len(set(keys)) < len(keys):
+            seen = set()
+            for output, key in zip(outputs, keys):
+                if key in seen:
+                    collisions[output] = [source, source]
+                seen.add(key)
+        if collisions:
+            raise OutputCollisionError(collisions)
+        if not remember:
+            return outputs
+        for output, key in zip(outputs, keys):
+            self._claimed[key] = source
+            unnumbered = _unnumbered(key) if self.split_frames else None
+            if unnumbered is not None:
+                self._numbered.setdefault(unnumbered, {}).setdefault(source, output)
+        return outputs
+
+    def _conflict(self, output: str, key: str, source: str) -> tuple | None:
+        """(path, owner) of a claim by another source that output (key normalised) would overwrite, if any."""
+        owner = self._claimed.get(key, source)
+        if owner != source:
+            return output, owner
+        if self.split_frames:
+            # output may be one of the frames of another source's output...
+            unnumbered = _unnumbered(key)
+            owner = self._claimed.get(unnumbered, source) if unnumbered is not None else source
+            if owner != source:
+                return output, owner
+            # ...or its own frames may overwrite another source's numbered output
+            for owner, path in self._numbered.get(key, {}).items():
+                if owner != source:
+                    return path, owner
+        return None
+
+    def plan(self, files: Iterable[str], specs: list) -> dict:
+        """Claim every source upfront. Returns {source: [output path per spec]}.
+
+        Raises OutputCollisionError naming every collision found, before
+        anything is written.
+        """
+        planned = {}
+        collisions = {}
+        for file_path in files:
+            try:
+                planned[file_path] = self.claim(file_path, specs)
+            except OutputCollisionError as exc:
+                collisions.update(exc.collisions)
+        if collisions:
+            raise OutputCollisionError(collisions)
+        return planned
+
+
+def frame_path(output_path: str, index: int, count: int) -> str:
+    """Output path of frame index in split mode: numbered from 1 when there are several."""
+    if count == 1:
+        return output_path
+    base, ext = os.path.splitext(output_path)
+    return f"{base}_{index + 1:0{len(str(count))}d}{ext}"
+
+
+def _unnumbered(path: str) -> str | None:
+    """path without a trailing _<digits> on its stem (out/photo_02.png -> out/photo.png), None if it has none."""
+    base, ext = os.path.splitext(path)
+    head, sep, number = base.rpartition("_")
+    if not sep or not number.isdigit() or not os.path.basename(head):
+        return None
+    return head + ext
@@ -0,0 +1,94 @@
+from typing import NamedTuple
+from PIL import Image, ImageOps
+
+from .conversion import get_compatible_formats
+from .heif import register_heif
+
+
+# ISO-BMFF major brands of HEIF/HEIC files (bytes 8-12, after the "ftyp" box type)
+HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"hevm", b"hevs", b"mif1", b"msf1"}
+
+
+class ImageInfo(NamedTuple):
+    format: str | None
+    mode: str
+    size: tuple
+    compatible_formats: list
+
+
+def probe_image(file_path: str) -> ImageInfo:
+    """Read format, mode and size from the file header without decoding pixels.
+
+    Raises the same exceptions as Image.open (UnidentifiedImageError, OSError).
+    """
+    register_heif()
+    with Image.open(file_path) as img:
+        return ImageInfo(img.format, img.mode, img.size, get_compatible_formats(img))
+
+
+def sniff_format(file_path: str) -> str | None:
+    """Identify the format from the first bytes of the file, without invoking any decoder.
+
+    Returns a Pillow format name, or None if the signature isn't recognised.
+    """
+    with open(file_path, "rb") as fh:
+        head = fh.read(16)
+    if head.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "GIF"
+    if head.startswith((b"II*\x00", b"MM\x00*")):
+        return "TIFF"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "WEBP"
+    if head[4:8] == b"ftyp" and head[8:12] in HEIF_BRANDS:
+        return "HEIF"
+    if head.startswith(b"BM"):
+        return "BMP"
+    return None
+
+
+def validate_image_file(file_path: str) -> str | None:
+    """Cheap validity check for an input file, without decoding pixel data.
+
+    Known signatures are accepted from the magic bytes alone; anything else is
+    checked by parsing the header with Image.open. Returns the detected format.
+    Raises UnidentifiedImageError for non-images and OSError for unreadable files.
+    """
+    fmt = sniff_format(file_path)
+    if fmt is not None:
+        return fmt
+    return probe_image(file_path).format
+
+
+def open_reduced(file_path: str, box: tuple) -> Image.Image:
+    """Decode file_path at the lowest resolution that still covers box.
+
+    JPEGs are decoded with Image.draft (DCT scaling); anything else, HEIF
+    included, is fully decoded. pillow_heif lists the sizes of embedded HEIF
+    thumbnails but has no way to decode one. The result is loaded but not yet
+    resized to box, and holds no open file handle. Decode errors (e.g. a
+    truncated file) propagate.
+    """
+    register_heif()
+    with Image.open(file_path) as img:
+        if img.format == "JPEG":
+            img.draft(img.mode, box)
+        img.load()
+    return img
+
+
+def to_thumbnail(img: Image.Image, box: tuple) -> Image.Image:
+    """Return an RGB/RGBA copy of img scaled down to fit box; img is not modified."""
+    if img.width > box[0] or img.height > box[1]:
+        thumb = ImageOps.contain(img, box, Image.Resampling.LANCZOS)
+    else:
+        thumb = img.copy()
+    if thumb.mode not in ("RGB", "RGBA"):
+        if thumb.mode == "P" and "transparency" in thumb.info:
+            thumb = thumb.convert("RGBA")
+        else:
+            thumb = thumb.convert("RGB")
+    return thumb
@@ -0,0 +1,173 @@
+import os
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+from .conversion import decoded_nbytes, get_compatible_formats, load_image
+from .metrics import StageTimer
+from .probe import ImageInfo, open_reduced, probe_image, to_thumbnail
+from .thumbcache import ThumbnailCache
+
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+
+
+def image_nbytes(img: Image.Image) -> int:
+    return decoded_nbytes(img.mode, img.size)
+
+
+class _Entry:
+    __slots__ = ("key", "signature", "info", "image", "thumbnails", "nbytes")
+
+    def __init__(self, key: str, signature: tuple):
+        self.key = key
+        self.signature = signature
+        self.info: ImageInfo | None = None
+        self.image: Image.Image | None = None
+        self.thumbnails: dict[tuple, Image.Image] = {}
+        self.nbytes = 0
+
+
+class ImageRegistry:
+    """Session-wide registry of source images so each file is decoded at most once.
+
+    For every source it keeps the header info, derived thumbnails and, within
+    memory_budget bytes, the fully decoded image. Entries are evicted least
+    recently used first and invalidated when the file's size or mtime changes.
+    Info and thumbnails are derived from the decoded image whenever one is held.
+    Thread-safe: the GUI's thumbnail workers and conversion thread share it.
+    """
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET, thumbnail_cache: ThumbnailCache | None = None):
+        self.memory_budget = memory_budget
+        self.thumbnail_cache = thumbnail_cache
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._used = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _signature(file_path: str) -> tuple:
+        st = os.stat(file_path)  # Raises FileNotFoundError like Image.open would
+        return (st.st_size, st.st_mtime_ns)
+
+    def _entry(self, file_path: str) -> _Entry:
+        """Return the live entry for file_path, creating or invalidating it as needed. Lock held."""
+        key = os.path.abspath(file_path)
+        signature = self._signature(file_path)
+        entry = self._entries.get(key)
+        if entry is None or entry.signature != signature:
+            if entry is not None:
+                self._used -= entry.nbytes
+            entry = _Entry(key, signature)
+            self._entries[key] = entry
+        self._entries.move_to_end(key)
+        return entry
+
+    def _account(self, entry: _Entry) -> None:
+        """Recompute entry's size and evict older entries beyond the budget. Lock held."""
+        if self._entries.get(entry.key) is not entry:
+            return  # Evicted or invalidated while it was being decoded
+        nbytes = sum(image_nbytes(t) for t in entry.thumbnails.values())
+        if entry.image is not None:
+            nbytes += image_nbytes(entry.image)
+        self._used += nbytes - entry.nbytes
+        entry.nbytes = nbytes
+        for key in list(self._entries):
+            if self._used <= self.memory_budget:
+                break
+            if key != entry.key:
+                self._used -= self._entries.pop(key).nbytes
+        if self._used > self.memory_budget and entry.image is not None:
+            # A single image larger than the whole budget is not retained
+            image_bytes = image_nbytes(entry.image)
+            entry.image = None
+            entry.nbytes -= image_bytes
+            self._used -= image_bytes
+
+    def has_image(self, file_path: str) -> bool:
+        """True if the decoded image for file_path is currently held."""
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(file_path))
+            if entry is None or entry.image is None:
+                return False
+            try:
+                return entry.signature == self._signature(file_path)
+            except OSError:
+                return False
+
+    def info(self, file_path: str) -> ImageInfo:
+        """Format, mode, size and compatible output formats, without decoding pixels."""
+        with self._lock:
+            entry = self._entry(file_path)
+            if entry.info is not None:
+                return entry.info
+            image = entry.image
+        info = probe_image(file_path) if image is None else ImageInfo(
+            image.format, image.mode, image.size, get_compatible_formats(image)
+        )
+        with self._lock:
+            entry.info = info
+        return info
+
+    def image(self, file_path: str, timer: StageTimer | None = None) -> Image.Image:
+        """The fully decoded image. Callers must treat it as read-only.
+
+        timer is passed on to load_image; a held image records no stages.
+        """
+        with self._lock:
+            entry = self._entry(file_path)
+            if entry.image is not None:
+                return entry.image
+        image = load_image(file_path, timer)
+        self._store_image(entry, image)
+        return image
+
+    def _store_image(self, entry: _Entry, image: Image.Image) -> None:
+        with self._lock:
+            entry.image = image
+            entry.info = ImageInfo(image.format, image.mode, image.size, get_compatible_formats(image))
+            self._account(entry)
+
+    def thumbnail(self, file_path: str, box: tuple) -> Image.Image:
+        """An RGB/RGBA thumbnail fitting box.
+
+        Served from memory, then the on-disk thumbnail cache, then derived from
+        the decoded image if held. Otherwise the file is decoded at reduced
+        resolution; if that decode turned out to be full size it is kept, so a
+        later conversion does not decode the file again.
+        """
+        with self._lock:
+            entry = self._entry(file_path)
+            thumb = entry.thumbnails.get(box)
+            image = entry.image
+        if thumb is not None:
+            return thumb
+
+        if image is None and self.thumbnail_cache is not None:
+            thumb = self.thumbnail_cache.get(file_path, box)
+        if thumb is None:
+            if image is None:
+                decoded = open_reduced(file_path, box)
+                thumb = to_thumbnail(decoded, box)
+                info = self.info(file_path)
+                if decoded.size == info.size and decoded.mode == info.mode:
+                    self._store_image(entry, decoded)
+            else:
+                thumb = to_thumbnail(image, box)
+            if self.thumbnail_cache is not None:
+                self.thumbnail_cache.put(file_path, box, thumb)
+
+        with self._lock:
+            entry.thumbnails[box] = thumb
+            self._account(entry)
+        return thumb
+
+    def forget(self, file_path: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(os.path.abspath(file_path), None)
+            if entry is not None:
+                self._used -= entry.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._used = 0
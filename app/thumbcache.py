@@ -0,0 +1,159 @@
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+# Defaults sized for a few thousand 100x100 previews
+DEFAULT_MEMORY_ITEMS = 1024
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    """Per-user cache directory for thumbnails."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "heic-convert-free", "thumbnails")
+
+
+class ThumbnailCache:
+    """Two-level thumbnail cache: an in-memory LRU in front of an on-disk PNG store.
+
+    Entries are keyed on the absolute source path, its size and mtime and the
+    thumbnail box, so edited files miss automatically. The disk store is kept
+    under max_disk_bytes by evicting the least recently used files. Safe to
+    share between thumbnail worker threads.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        memory_items: int = DEFAULT_MEMORY_ITEMS,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+    ):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, Image.Image] = OrderedDict()
+        self._disk_bytes: int | None = None  # Computed lazily on first write
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(file_path: str, box: tuple) -> str | None:
+        """Cache key for file_path, or None if it cannot be stat'ed."""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        raw = f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}|{box[0]}x{box[1]}"
+        return hashlib.blake2b(raw.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def get(self, file_path: str, box: tuple) -> Image.Image | None:
+        key = self.key_for(file_path, box)
+        if key is None:
+            return None
+        with self._lock:
+            img = self._memory.get(key)
+            if img is not None:
+                self._memory.move_to_end(key)
+                return img
+        disk_path = self._disk_path(key)
+        try:
+            with Image.open(disk_path) as cached:
+                cached.load()
+                img = cached.copy()
+            os.utime(disk_path)  # Mark as recently used for eviction
+        except (OSError, ValueError):
+            return None
+        self._remember(key, img)
+        return img
+
+    def put(self, file_path: str, box: tuple, img: Image.Image) -> None:
+        key = self.key_for(file_path, box)
+        if key is None:
+            return
+        self._remember(key, img)
+        disk_path = self._disk_path(key)
+        tmp_path = f"{disk_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            img.save(tmp_path, format="PNG")
+            os.replace(tmp_path, disk_path)
+            written = os.path.getsize(disk_path)
+        except OSError as exc:
+            print(f"Warning: could not write thumbnail cache entry: {exc}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_usage()
+            else:
+                self._disk_bytes += written
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, key: str, img: Image.Image) -> None:
+        with self._lock:
+            self._memory[key] = img
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _iter_disk_entries(self):
+        try:
+            with os.scandir(self.cache_dir) as shards:
+                for shard in shards:
+                    if not shard.is_dir():
+                        continue
+                    with os.scandir(shard.path) as entries:
+                        for entry in entries:
+                            if entry.name.endswith(".png"):
+                                yield entry
+        except OSError:
+            return
+
+    def _scan_disk_usage(self) -> int:
+        total = 0
+        for entry in self._iter_disk_entries():
+            try:
+                total += entry.stat().st_size
+            except OSError:
+                continue
+        return total
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used entries until usage drops to 90% of the limit."""
+        entries = []
+        for entry in self._iter_disk_entries():
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_disk_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+        self._disk_bytes = total
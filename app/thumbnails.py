@@ -1,100 +1,276 @@
 import os
+import queue
 import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from tkinter import ttk
+from typing import Callable
 from PIL import Image, ImageTk, UnidentifiedImageError
 
+from .registry import ImageRegistry
+
 THUMBNAIL_SIZE = (100, 100)
 
+# How often finished thumbnails are drained into Tk, and how many per tick
+POLL_INTERVAL_MS = 30
+MAX_RESULTS_PER_POLL = 50
+
 
-def update_thumbnails(scrollable_frame: ttk.Frame, canvas: tk.Canvas, input_files: list) -> list:
-    """Populate the scrollable_frame with thumbnails for the given files.
+class ThumbnailLoader:
+    """Decode thumbnails on a worker pool and deliver them on the Tk main thread.
 
-    Returns a list of PhotoImage references to keep alive.
+    Workers only produce PIL images; callbacks run from an after() poll loop so
+    all widget work stays on the main thread. cancel() drops every request made
+    so far: queued work is abandoned and late results are discarded.
     """
-    for widget in scrollable_frame.winfo_children():
-        widget.destroy()
 
-    photo_refs: list[ImageTk.PhotoImage] = []
+    def __init__(self, root: tk.Misc, registry: ImageRegistry, workers: int | None = None):
+        self.root = root
+        self.registry = registry
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or min(4, os.cpu_count() or 1),
+            thread_name_prefix="thumbnail",
+        )
+        self._results: queue.SimpleQueue = queue.SimpleQueue()
+        self._futures: set[Future] = set()
+        self._generation = 0
+        self._polling = False
 
-    if not input_files:
-        no_files_label = ttk.Label(scrollable_frame, text="No images loaded.", style="secondary.TLabel")
-        no_files_label.pack(pady=20)
-        scrollable_frame.update_idletasks()
-        canvas.config(scrollregion=canvas.bbox("all"))
-        return photo_refs
+    def request(
+        self,
+        file_path: str,
+        callback: Callable[[Image.Image | None, Exception | None], None],
+    ) -> Future:
+        """Queue file_path; callback(image, error) is later called on the main thread.
 
-    row = col = 0
-    frame_width = scrollable_frame.winfo_width() or 550
-    max_cols = max(1, frame_width // (THUMBNAIL_SIZE[0] + 15))
+        The returned future can be cancelled to drop the request if it hasn't started.
+        """
+        future = self._executor.submit(self._load, self._generation, file_path, callback)
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+        return future
 
-    for file_path in input_files:
-        thumb_frame = ttk.Frame(scrollable_frame, padding=2)
-        thumb_frame.grid(row=row, column=col, padx=5, pady=5, sticky="nsew")
+    def cancel(self) -> None:
+        self._generation += 1
+        for future in list(self._futures):
+            future.cancel()
 
-        filename = os.path.basename(file_path)
-        max_len = 15
-        display_name = (filename[:max_len] + "...") if len(filename) > max_len else filename
+    def shutdown(self) -> None:
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
+    def _load(self, generation: int, file_path: str, callback) -> None:
+        if generation != self._generation:
+            return
         try:
-            img = Image.open(file_path)
-            try:
-                img.load()
-            except Exception as exc:
-                print(f"Warning loading {filename} for thumbnail: {exc}")
-
-            img.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
-            if img.mode not in ("RGB", "RGBA"):
-                if img.mode == "P" and "transparency" in img.info:
-                    img = img.convert("RGBA")
-                else:
-                    img = img.convert("RGB")
-
-            photo_img = ImageTk.PhotoImage(img)
-            img_label = ttk.Label(thumb_frame, image=photo_img)
-            img_label.image = photo_img
-            img_label.pack()
-            name_label = ttk.Label(thumb_frame, text=display_name, anchor=tk.CENTER, wraplength=THUMBNAIL_SIZE[0])
-            name_label.pack(fill=tk.X)
-            photo_refs.append(photo_img)
-        except UnidentifiedImageError:
-            error_label = ttk.Label(
-                thumb_frame,
-                text=f"{display_name}\n(unidentified)",
-                relief=tk.SOLID,
-                width=15,
-                anchor=tk.CENTER,
-                justify=tk.CENTER,
-                style="secondary.TLabel",
-            )
-            error_label.pack(ipadx=5, ipady=10)
-        except FileNotFoundError:
-            error_label = ttk.Label(
-                thumb_frame,
-                text=f"{display_name}\n(not found)",
-                relief=tk.SOLID,
-                width=15,
-                anchor=tk.CENTER,
-                justify=tk.CENTER,
-                style="secondary.TLabel",
-            )
-            error_label.pack(ipadx=5, ipady=10)
+            img = self.registry.thumbnail(file_path, THUMBNAIL_SIZE)
         except Exception as exc:
-            error_label = ttk.Label(
-                thumb_frame,
-                text=f"{display_name}\n(Error: {type(exc).__name__})",
-                relief=tk.SOLID,
-                width=15,
-                anchor=tk.CENTER,
-                justify=tk.CENTER,
-                style="secondary.TLabel",
+            self._results.put((generation, callback, None, exc))
+        else:
+            self._results.put((generation, callback, img, None))
+
+    def _poll(self) -> None:
+        for _ in range(MAX_RESULTS_PER_POLL):
+            try:
+                generation, callback, img, exc = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation:
+                continue
+            try:
+                callback(img, exc)
+            except tk.TclError:
+                pass  # Target widget was destroyed in the meantime
+        if self._futures or not self._results.empty():
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+        else:
+            self._polling = False
+
+
+# Fixed tile geometry so visible rows can be computed from the scroll offset
+TILE_WIDTH = THUMBNAIL_SIZE[0] + 15
+TILE_HEIGHT = THUMBNAIL_SIZE[1] + 45
+OVERSCAN_ROWS = 2
+# PhotoImages kept for files that scrolled out of view
+PHOTO_CACHE_ITEMS = 256
+
+
+def _describe_error(exc: Exception) -> str:
+    if isinstance(exc, UnidentifiedImageError):
+        return "unidentified"
+    if isinstance(exc, FileNotFoundError):
+        return "not found"
+    return f"Error: {type(exc).__name__}"
+
+
+def _display_name(file_path: str, max_len: int = 15) -> str:
+    filename = os.path.basename(file_path)
+    return (filename[:max_len] + "...") if len(filename) > max_len else filename
+
+
+class _Tile:
+    """A reusable thumbnail tile: an image label above a file name label."""
+
+    def __init__(self, parent: ttk.Frame):
+        self.frame = ttk.Frame(parent, padding=2)
+        self.img_label = ttk.Label(self.frame, anchor=tk.CENTER, justify=tk.CENTER, style="secondary.TLabel")
+        self.img_label.place(relx=0.5, y=0, anchor="n", width=THUMBNAIL_SIZE[0], height=THUMBNAIL_SIZE[1])
+        self.name_label = ttk.Label(self.frame, anchor=tk.CENTER, justify=tk.CENTER, wraplength=THUMBNAIL_SIZE[0])
+        self.name_label.place(relx=0.5, y=THUMBNAIL_SIZE[1] + 2, anchor="n", width=TILE_WIDTH - 10)
+        self.path: str | None = None
+        self.future: Future | None = None
+
+    def show_photo(self, photo: ImageTk.PhotoImage) -> None:
+        self.img_label.config(image=photo, text="", relief=tk.FLAT)
+        self.img_label.image = photo
+
+    def show_text(self, text: str, relief=tk.FLAT) -> None:
+        self.img_label.config(image="", text=text, relief=relief)
+        self.img_label.image = None
+
+    def release(self) -> None:
+        if self.future is not None:
+            self.future.cancel()
+            self.future = None
+        self.path = None
+        self.show_text("")
+        self.frame.place_forget()
+
+
+class ThumbnailGrid:
+    """Virtualized thumbnail grid on the preview canvas.
+
+    Only rows inside the viewport (plus OVERSCAN_ROWS above and below) have
+    widgets. Tiles are recycled as the view scrolls and thumbnails are requested
+    from the loader only when a tile becomes visible, so widget count and Tk
+    memory stay constant however many files are listed.
+    """
+
+    def __init__(
+        self,
+        canvas: tk.Canvas,
+        scrollable_frame: ttk.Frame,
+        scrollbar: ttk.Scrollbar,
+        loader: ThumbnailLoader,
+    ):
+        self.canvas = canvas
+        self.frame = scrollable_frame
+        self.scrollbar = scrollbar
+        self.loader = loader
+        self.files: list = []
+        self._columns = 1
+        self._rows = 0
+        self._active: dict[int, _Tile] = {}
+        self._free: list[_Tile] = []
+        self._photos: OrderedDict[str, ImageTk.PhotoImage] = OrderedDict()
+        self._errors: dict[str, str] = {}
+        self._refresh_pending = False
+        self._empty_label = ttk.Label(self.frame, text="No images loaded.", style="secondary.TLabel")
+
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
+        self.canvas.bind("<Configure>", lambda e: self._layout(), add="+")
+
+    def set_files(self, files: list) -> None:
+        """Show files, reusing decoded thumbnails for paths already seen."""
+        self.loader.cancel()
+        self.files = list(files)
+        live = set(self.files)
+        self._errors = {path: reason for path, reason in self._errors.items() if path in live}
+        self._release_all()
+        self._layout(force=True)
+
+    def _viewport_width(self) -> int:
+        width = self.canvas.winfo_width()
+        return width if width > 1 else 550
+
+    def _layout(self, force: bool = False) -> None:
+        columns = max(1, self._viewport_width() // TILE_WIDTH)
+        if not force and columns == self._columns:
+            self._schedule_refresh()
+            return
+        self._columns = columns
+        self._rows = -(-len(self.files) // columns)
+        self._release_all()
+        if self.files:
+            self._empty_label.place_forget()
+            height = self._rows * TILE_HEIGHT + 10
+        else:
+            self._empty_label.place(relx=0.5, y=20, anchor="n")
+            height = 60
+        self.frame.configure(width=self._viewport_width(), height=height)
+        self.frame.update_idletasks()
+        self.canvas.config(scrollregion=self.canvas.bbox("all"))
+        self._schedule_refresh()
+
+    def _on_yscroll(self, first, last) -> None:
+        self.scrollbar.set(first, last)
+        self._schedule_refresh()
+
+    def _schedule_refresh(self) -> None:
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.canvas.after_idle(self._refresh)
+
+    def _refresh(self) -> None:
+        """Bind tiles to the rows now in view and recycle the rest."""
+        self._refresh_pending = False
+        if not self.files:
+            return
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first_row = max(0, int(top // TILE_HEIGHT) - OVERSCAN_ROWS)
+        last_row = min(self._rows - 1, int(bottom // TILE_HEIGHT) + OVERSCAN_ROWS)
+        wanted = range(first_row * self._columns, min(len(self.files), (last_row + 1) * self._columns))
+
+        for index in [i for i in self._active if i not in wanted]:
+            tile = self._active.pop(index)
+            tile.release()
+            self._free.append(tile)
+        for index in wanted:
+            if index not in self._active:
+                tile = self._free.pop() if self._free else _Tile(self.frame)
+                self._active[index] = tile
+                self._bind(tile, index)
+
+    def _bind(self, tile: _Tile, index: int) -> None:
+        path = self.files[index]
+        row, col = divmod(index, self._columns)
+        tile.path = path
+        tile.name_label.config(text=_display_name(path))
+        tile.frame.place(x=col * TILE_WIDTH + 5, y=row * TILE_HEIGHT + 5, width=TILE_WIDTH - 10, height=TILE_HEIGHT - 10)
+
+        photo = self._photos.get(path)
+        if photo is not None:
+            self._photos.move_to_end(path)
+            tile.show_photo(photo)
+        elif path in self._errors:
+            tile.show_text(f"({self._errors[path]})", relief=tk.SOLID)
+        else:
+            tile.show_text("Loading...")
+            tile.future = self.loader.request(
+                path, lambda img, exc, tile=tile, path=path: self._on_loaded(tile, path, img, exc)
             )
-            error_label.pack(ipadx=5, ipady=10)
-        finally:
-            col += 1
-            if col >= max_cols:
-                col = 0
-                row += 1
-
-    scrollable_frame.update_idletasks()
-    canvas.config(scrollregion=canvas.bbox("all"))
-    return photo_refs
+
+    def _on_loaded(self, tile: _Tile, path: str, img, exc) -> None:
+        if exc is not None:
+            self._errors[path] = _describe_error(exc)
+        else:
+            self._photos[path] = ImageTk.PhotoImage(img)
+            while len(self._photos) > PHOTO_CACHE_ITEMS:
+                self._photos.popitem(last=False)  # Tiles still showing it hold their own reference
+        if tile.path != path:
+            return  # Tile was recycled for another file
+        tile.future = None
+        if exc is not None:
+            tile.show_text(f"({self._errors[path]})", relief=tk.SOLID)
+        else:
+            tile.show_photo(self._photos[path])
+
+    def _release_all(self) -> None:
+        for tile in self._active.values():
+            tile.release()
+            self._free.append(tile)
+        self._active.clear()
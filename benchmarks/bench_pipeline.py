@@ -0,0 +1,225 @@
+"""Throughput benchmark for the conversion and thumbnail hot paths.
+
+Synthesizes corpora (HEIC, RGBA PNG, palette GIF, grayscale PNG, JPEG and
+optionally 24/48 MP frames), then measures files/sec, MB/sec, per-stage time
+and peak RSS for convert_images, get_compatible_formats and headless
+thumbnailing. Every case runs in a fresh subprocess so peak RSS is per case.
+Results are written as JSON for tracking regressions across releases.
+
+    python benchmarks/bench_pipeline.py --count 50 --formats JPEG PNG --out bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+import pillow_heif  # noqa: E402
+
+pillow_heif.register_heif_opener()
+
+# name: (extension, mode, size, save kwargs)
+CORPORA = {
+    "heic": (".heic", "RGB", (4032, 3024), {"quality": 85}),
+    "rgba_png": (".png", "RGBA", (2048, 1536), {}),
+    "palette_gif": (".gif", "P", (1024, 768), {}),
+    "grayscale_png": (".png", "L", (2048, 1536), {}),
+    "jpeg": (".jpg", "RGB", (4032, 3024), {"quality": 90}),
+}
+LARGE_CORPORA = {
+    "large_jpeg_24mp": (".jpg", "RGB", (6000, 4000), {"quality": 90}),
+    "large_heic_48mp": (".heic", "RGB", (8064, 6048), {"quality": 85}),
+}
+THUMBNAIL_BOX = (100, 100)
+
+
+def _synth_image(mode: str, size: tuple, seed: int) -> Image.Image:
+    """Noise over a gradient, so encoders see photo-like entropy."""
+    noise = Image.effect_noise(size, 40 + seed % 20)
+    gradient = Image.linear_gradient("L").resize(size)
+    base = Image.blend(noise, gradient, 0.5)
+    if mode == "L":
+        return base
+    rgb = Image.merge("RGB", (base, gradient, noise))
+    if mode == "RGB":
+        return rgb
+    if mode == "RGBA":
+        rgba = rgb.convert("RGBA")
+        rgba.putalpha(Image.radial_gradient("L").resize(size))
+        return rgba
+    if mode == "P":
+        img = rgb.quantize(colors=255)
+        img.info["transparency"] = 0
+        return img
+    return rgb.convert(mode)
+
+
+def synthesize(corpus_dir: str, name: str, spec: tuple, count: int) -> list:
+    ext, mode, size, save_kwargs = spec
+    target = os.path.join(corpus_dir, name)
+    os.makedirs(target, exist_ok=True)
+    files = []
+    for i in range(count):
+        path = os.path.join(target, f"{name}_{i:04d}{ext}")
+        if not os.path.exists(path):
+            _synth_image(mode, size, i).save(path, **save_kwargs)
+        files.append(path)
+    return files
+
+
+def _vm_hwm_bytes() -> int | None:
+    """Linux high-water mark of this process. Unlike ru_maxrss it is reset by exec."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_bytes() -> dict:
+    """Peak resident set size of this process and of its (largest) child."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+        except ImportError:
+            return {"self": None, "children": None}
+        return {"self": psutil.Process().memory_info().peak_wset, "children": None}
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+    return {
+        "self": _vm_hwm_bytes() or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+def run_case(case: dict) -> dict:
+    """Execute one measurement in this process and return its metrics."""
+    from app.conversion import convert_images, get_compatible_formats
+    from app.metrics import ConversionMetrics
+    from app.registry import ImageRegistry
+
+    files = case["files"]
+    input_bytes = sum(os.path.getsize(f) for f in files)
+    stage = case["stage"]
+    start = time.perf_counter()
+    extra = {}
+
+    if stage == "convert":
+        out_dir = tempfile.mkdtemp(prefix="bench_out_", dir=case["workdir"])
+        metrics = ConversionMetrics()
+        success, errors = convert_images(
+            files, case["output_fmt"], out_dir,
+            workers=case["workers"], chunk_size=case["chunk_size"], metrics=metrics,
+        )
+        extra = {
+            "success": success,
+            "errors": errors,
+            "stage_seconds": {stage: h.sum for stage, h in metrics.stage_seconds.items() if h.count},
+        }
+    elif stage == "compatible_formats":
+        for path in files:
+            with Image.open(path) as img:
+                img.load()
+                get_compatible_formats(img)
+    elif stage == "thumbnail":
+        registry = ImageRegistry(memory_budget=0)  # No retention: measure decode + downscale only
+        for path in files:
+            registry.thumbnail(path, THUMBNAIL_BOX)
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+
+    elapsed = time.perf_counter() - start
+    return {
+        "corpus": case["corpus"],
+        "stage": stage,
+        "output_fmt": case.get("output_fmt"),
+        "workers": case.get("workers"),
+        "files": len(files),
+        "input_bytes": input_bytes,
+        "seconds": elapsed,
+        "files_per_sec": len(files) / elapsed if elapsed else None,
+        "mb_per_sec": input_bytes / 1e6 / elapsed if elapsed else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+        **extra,
+    }
+
+
+def _run_isolated(case: dict) -> dict:
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case"],
+        input=json.dumps(case),  # Via stdin: file lists can exceed command-line limits
+        capture_output=True, text=True, check=False,
+    )
+    if proc.returncode != 0:
+        return {"corpus": case["corpus"], "stage": case["stage"], "error": proc.stderr.strip()[-2000:]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20, help="Files per corpus (default: %(default)s)")
+    parser.add_argument("--large", action="store_true", help="Also benchmark 24 MP and 48 MP frames")
+    parser.add_argument("--corpora", nargs="*", help="Restrict to these corpus names")
+    parser.add_argument("--formats", nargs="*", default=["JPEG", "PNG", "WEBP"], type=str.upper)
+    parser.add_argument("--workers", nargs="*", type=int, default=[1, os.cpu_count() or 1])
+    parser.add_argument("--chunk-size", type=int, default=1)
+    parser.add_argument("--workdir", help="Where corpora are generated and kept between runs")
+    parser.add_argument("--out", help="Write JSON results here instead of stdout")
+    parser.add_argument("--run-case", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(json.load(sys.stdin))))
+        return 0
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="heic_bench_")
+    corpora = dict(CORPORA, **(LARGE_CORPORA if args.large else {}))
+    if args.corpora:
+        corpora = {name: spec for name, spec in corpora.items() if name in args.corpora}
+
+    results = []
+    for name, spec in corpora.items():
+        print(f"Preparing {name}...", file=sys.stderr)
+        files = synthesize(os.path.join(workdir, "corpus"), name, spec, args.count)
+        base = {"corpus": name, "files": files, "workdir": workdir}
+        cases = [dict(base, stage="compatible_formats"), dict(base, stage="thumbnail")]
+        for fmt in args.formats:
+            for workers in dict.fromkeys(args.workers):
+                cases.append(dict(
+                    base, stage="convert", output_fmt=fmt, workers=workers, chunk_size=args.chunk_size,
+                ))
+        for case in cases:
+            print(f"  {case['stage']} {case.get('output_fmt') or ''} {case.get('workers') or ''}", file=sys.stderr)
+            results.append(_run_isolated(case))
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pillow": Image.__version__,
+        "pillow_heif": pillow_heif.__version__,
+        "count": args.count,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""Import-time profile of the app entry points, to hold cold start under a budget.
+
+Imports each target module in a fresh interpreter with -X importtime, several
+times, and reports the median import time together with the modules that cost
+the most in the median run. Heavy dependencies that must stay deferred until
+first use (pillow_heif, multiprocessing, sqlite3) are reported if a target
+imports them. With --window the GUI is also started until its window has been
+drawn, which needs a display.
+
+Exits with status 1 if a target exceeds its budget or imports a deferred module.
+
+    python benchmarks/bench_startup.py --runs 9 --budget-ms 150 --window --window-budget-ms 400 --out startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Label: module imported in a fresh interpreter
+TARGETS = {
+    "gui": "app.gui",
+    "cli": "app.cli",
+    "conversion": "app.conversion",
+}
+# Imported on first use only; importing any of these at startup is a regression
+DEFERRED_MODULES = ("pillow_heif", "multiprocessing", "sqlite3")
+
+WINDOW_SCRIPT = """
+import time
+from app import ImageConverterApp
+app = ImageConverterApp()
+app.update()
+print(time.time())
+app.destroy()
+"""
+
+
+def parse_importtime(stderr: str) -> list:
+    """(module, self_us, cumulative_us, depth) per "import time:" line, in import order."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Header line
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        rows.append((stripped, int(fields[0]), int(fields[1]), depth))
+    return rows
+
+
+def profile_import(module: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=False,
+    )
+    rows = parse_importtime(proc.stderr)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip()[-2000:]}
+    total = next((cum for name, _, cum, depth in rows if name == module and depth == 0), None)
+    imported = {name for name, _, _, _ in rows}
+    return {
+        "ms": total / 1000 if total is not None else None,
+        "modules": len(rows),
+        "deferred_imported": [m for m in DEFERRED_MODULES if m in imported],
+        "top_self_ms": [
+            (name, us / 1000) for name, us, _, _ in sorted(rows, key=lambda row: row[1], reverse=True)[:10]
+        ],
+    }
+
+
+def profile_window() -> dict:
+    """Seconds from spawning the interpreter to the main window having been drawn."""
+    start = time.time()
+    proc = subprocess.run(
+        [sys.executable, "-c", WINDOW_SCRIPT], cwd=ROOT, capture_output=True, text=True, check=False,
+    )
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip()[-2000:]}
+    return {"ms": (float(proc.stdout.strip().splitlines()[-1]) - start) * 1000}
+
+
+def _median_run(runs: list) -> dict:
+    ok = [run for run in runs if "error" not in run]
+    if not ok:
+        return runs[-1]
+    ok.sort(key=lambda run: run["ms"] or 0.0)
+    median = dict(ok[len(ok) // 2])
+    median["median_ms"] = statistics.median(run["ms"] or 0.0 for run in ok)
+    median["min_ms"] = ok[0]["ms"]
+    median["runs"] = len(ok)
+    return median
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7, help="Fresh interpreters per target (default: %(default)s)")
+    parser.add_argument("--targets", nargs="*", choices=sorted(TARGETS), default=sorted(TARGETS))
+    parser.add_argument("--budget-ms", type=float, help="Fail if a target's median import time exceeds this")
+    parser.add_argument("--window", action="store_true", help="Also time the GUI until its window is drawn")
+    parser.add_argument("--window-budget-ms", type=float, help="Fail if the median time to a drawn window exceeds this")
+    parser.add_argument("--out", help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for label in args.targets:
+        print(f"Profiling {TARGETS[label]}...", file=sys.stderr)
+        results[label] = _median_run([profile_import(TARGETS[label]) for _ in range(max(1, args.runs))])
+    if args.window:
+        print("Profiling window startup...", file=sys.stderr)
+        results["window"] = _median_run([profile_window() for _ in range(max(1, args.runs))])
+
+    failures = []
+    for label, result in results.items():
+        if "error" in result:
+            failures.append(f"{label}: failed to start")
+            continue
+        budget = args.window_budget_ms if label == "window" else args.budget_ms
+        if budget is not None and result["median_ms"] > budget:
+            failures.append(f"{label}: {result['median_ms']:.1f} ms exceeds the {budget:g} ms budget")
+        if result.get("deferred_imported"):
+            failures.append(f"{label}: imports {', '.join(result['deferred_imported'])} at startup")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "budget_ms": args.budget_ms,
+        "window_budget_ms": args.window_budget_ms,
+        "results": results,
+        "failures": failures,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    else:
+        print(text)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
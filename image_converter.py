@@ -1,13 +1,13 @@
 import sys
+import multiprocessing
 import tkinter as tk
 from tkinter import ttk
-import pillow_heif
 
 from app import ImageConverterApp
 
 
 if __name__ == "__main__":
-    pillow_heif.register_heif_opener()
+    multiprocessing.freeze_support()  # Required for the process pool in frozen builds
 
     app = ImageConverterApp()
 
@@ -0,0 +1,9 @@
+import multiprocessing
+import sys
+
+from app.cli import main
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Required for the process pool in frozen builds
+    sys.exit(main())
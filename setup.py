@@ -4,10 +4,13 @@ from cx_Freeze import setup, Executable
 
 # Dependencies - Add more specific package includes for tkinterdnd2
 build_exe_options = {
+    # pillow_heif and the Pillow plugins are imported lazily, so list them
+    # explicitly: the import scanner can't see deferred imports
     "packages": ["tkinter", "PIL", "pillow_heif", "tkinterdnd2", "app"],
-    "includes": ["tkinter", "tkinter.ttk", "PIL", "pillow_heif", "tkinterdnd2"],
+    "includes": ["tkinter.ttk"],
     "include_files": ["app_icon.ico"],  # Include the icon file
-    "excludes": []
+    # Never used at runtime; numpy is only an optional Pillow/pillow_heif integration
+    "excludes": ["unittest", "pydoc_data", "lib2to3", "test", "numpy"]
 }
 
 # Base for GUI applications
@@ -68,6 +71,12 @@ setup(
             base=base,
             target_name="SimpleImageConverter.exe",
             icon="app_icon.ico"  # Will use this icon if it exists
-        )
+        ),
+        # Headless console build of the same converter (no tkinter needed at runtime)
+        Executable(
+            "image_converter_cli.py",
+            base=None,
+            target_name="SimpleImageConverterCLI.exe",
+        ),
     ]
 ) 
\ No newline at end of file